@@ -0,0 +1,229 @@
+"""Замеры производительности модуля homework.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_homework.py --sizes 1000 100000
+    python benchmarks/bench_homework.py --save-baseline
+    python benchmarks/bench_homework.py --compare --tolerance 0.2
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from itertools import cycle, islice
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(BASE_DIR))
+
+import homework  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+POOL_SIZE = 10000
+Package = Tuple[str, List[float]]
+
+
+def generate_packages(size: int, seed: int = 0) -> List[Package]:
+    """Сгенерировать смешанный набор правдоподобных пакетов."""
+    rnd = random.Random(seed)
+    packages: List[Package] = []
+    for _ in range(size):
+        workout_type = rnd.choices(['RUN', 'WLK', 'SWM'], [5, 3, 2])[0]
+        duration = rnd.uniform(0.25, 3.0)
+        weight = rnd.uniform(45.0, 120.0)
+        if workout_type == 'RUN':
+            data = [rnd.randint(2000, 30000), duration, weight]
+        elif workout_type == 'WLK':
+            data = [rnd.randint(2000, 30000), duration, weight,
+                    rnd.uniform(150.0, 200.0)]
+        else:
+            data = [rnd.randint(200, 3000), duration, weight,
+                    rnd.choice([25, 50]), rnd.randint(10, 80)]
+        packages.append((workout_type, data))
+    return packages
+
+
+Case = Callable[[], Optional[float]]
+
+
+def bench_read_package(size: int) -> Case:
+    pool = generate_packages(min(size, POOL_SIZE))
+    read_package = homework.read_package
+
+    def run() -> None:
+        for workout_type, data in islice(cycle(pool), size):
+            read_package(workout_type, data)
+    return run
+
+
+def bench_method(code: str, method: str) -> Callable[[int], Case]:
+    def setup(size: int) -> Case:
+        pool = [package for package in generate_packages(POOL_SIZE)
+                if package[0] == code][:size]
+        trainings = [homework.read_package(workout_type, data)
+                     for workout_type, data in pool]
+
+        def run() -> float:
+            # Метрики кэшируются в экземпляре, поэтому пул проходится
+            # по частям, а кэш сбрасывается между проходами вне замера.
+            elapsed = 0.0
+            remaining = size
+            while remaining > 0:
+                batch = trainings[:remaining]
+                for training in batch:
+                    training._distance = None
+                    training._speed = None
+                    training._calories = None
+                start = time.perf_counter()
+                for training in batch:
+                    getattr(training, method)()
+                elapsed += time.perf_counter() - start
+                remaining -= len(batch)
+            return elapsed
+        return run
+    return setup
+
+
+def bench_show_training_info(size: int) -> Case:
+    pool = generate_packages(min(size, POOL_SIZE))
+    read_package = homework.read_package
+
+    def run() -> None:
+        for workout_type, data in islice(cycle(pool), size):
+            read_package(workout_type, data).show_training_info()
+    return run
+
+
+def bench_get_message(size: int) -> Case:
+    messages = [homework.read_package(*package).show_training_info()
+                for package in generate_packages(min(size, POOL_SIZE))]
+
+    def run() -> None:
+        for message in islice(cycle(messages), size):
+            message.get_message()
+    return run
+
+
+def bench_batch_render(size: int) -> Case:
+    pool = generate_packages(min(size, POOL_SIZE))
+
+    def run() -> None:
+        chunks = homework.iter_chunks(islice(cycle(pool), size), 100000)
+        for result in map(homework.read_package_batch, chunks):
+            homework.render_messages(result)
+    return run
+
+
+CASES: Dict[str, Callable[[int], Case]] = {
+    'read_package': bench_read_package,
+    'show_training_info': bench_show_training_info,
+    'get_message': bench_get_message,
+    'batch_render': bench_batch_render,
+}
+for _code, _name in (('RUN', 'Running'), ('WLK', 'SportsWalking'),
+                     ('SWM', 'Swimming')):
+    for _method in ('get_mean_speed', 'get_spent_calories'):
+        CASES[f'{_name}.{_method}'] = bench_method(_code, _method)
+
+
+def measure(setup: Callable[[int], Case],
+            size: int,
+            repeat: int,
+            memory: bool
+            ) -> Dict[str, float]:
+    """Замерить пропускную способность и пиковую память сценария.
+
+    Сценарий может сам вернуть время замеренной части, если ему нужна
+    подготовка вне замера.
+    """
+    case = setup(size)
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        measured = case()
+        if measured is None:
+            measured = time.perf_counter() - start
+        elapsed = min(elapsed, measured)
+    stats = {'seconds': elapsed, 'throughput': size / elapsed}
+    if memory:
+        tracemalloc.start()
+        case()
+        stats['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return stats
+
+
+def run(cases: Sequence[str],
+        sizes: Sequence[int],
+        repeat: int,
+        memory: bool
+        ) -> Dict[str, Dict[str, float]]:
+    """Выполнить выбранные сценарии на всех размерах."""
+    results: Dict[str, Dict[str, float]] = {}
+    for size in sizes:
+        for name in cases:
+            key = f'{name}[{size}]'
+            results[key] = stats = measure(CASES[name], size, repeat, memory)
+            line = f'{key:<45} {stats["throughput"]:>14,.0f} пакетов/с'
+            if memory:
+                line += f' {stats["peak_memory"] / 2 ** 20:>10.2f} МиБ'
+            print(line)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]],
+            tolerance: float
+            ) -> List[str]:
+    """Найти сценарии, замедлившиеся сильнее допустимого."""
+    regressions: List[str] = []
+    for key, stats in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        ratio = stats['throughput'] / reference['throughput']
+        if ratio < 1 - tolerance:
+            regressions.append(f'{key}: {ratio:.2f} от базовой линии')
+    return regressions
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES),
+                        default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='не замерять пиковую память')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='допустимое падение пропускной способности')
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] = ()) -> int:
+    args = parse_args(argv)
+    results = run(args.cases, args.sizes, args.repeat, not args.no_memory)
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results,
+        }, indent=2, sort_keys=True))
+    if args.compare:
+        baseline = json.loads(args.baseline.read_text())['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print('Регрессия:', regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
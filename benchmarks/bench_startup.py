@@ -0,0 +1,57 @@
+"""Замер времени запуска модуля homework как короткой команды.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_startup.py --runs 30
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
+HOMEWORK = str(BASE_DIR / 'homework.py')
+SAMPLE = (b'SWM 720 1 80 25 40\n'
+          b'RUN 1206 12 6\n'
+          b'WLK 9000 1 75 180\n')
+COMMANDS: Dict[str, List[str]] = {
+    'python -c pass': [sys.executable, '-c', 'pass'],
+    'import homework': [sys.executable, '-c', 'import homework'],
+    'homework.py < sample': [sys.executable, HOMEWORK],
+}
+
+
+def measure(command: Sequence[str], runs: int) -> List[float]:
+    """Запустить команду runs раз и вернуть время каждого запуска в мс."""
+    timings: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, input=SAMPLE, stdout=subprocess.DEVNULL,
+                       check=True, cwd=BASE_DIR)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args(argv)
+    baseline: Optional[float] = None
+    for name, command in COMMANDS.items():
+        timings = measure(command, args.runs)
+        best = min(timings)
+        line = (f'{name:<25} мин {best:7.2f} мс, '
+                f'медиана {statistics.median(timings):7.2f} мс')
+        if baseline is None:
+            baseline = best
+        else:
+            line += f', сверх интерпретатора {best - baseline:7.2f} мс'
+        print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
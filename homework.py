@@ -1,16 +1,178 @@
-from dataclasses import dataclass, asdict
-from typing import Dict, Type
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import accumulate, islice
+from operator import attrgetter
+from string import Formatter
+from time import perf_counter
+from typing import (TYPE_CHECKING, Any, AsyncIterable, AsyncIterator,
+                    BinaryIO, Callable, Dict, Iterable, Iterator, List,
+                    Optional, Sequence, Sized, TextIO, Tuple, Type,
+                    Union)
 
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import Future
 
-@dataclass
-class InfoMessage:
+PRINTF_SPEC = re.compile(r'[+ ]?#?0?\d*(?:\.\d+)?[eEfFgG]')
+
+
+def compile_template(template: str) -> Tuple[str, Tuple[str, ...]]:
+    """Преобразовать шаблон str.format в шаблон оператора %.
+
+    Поддерживаются именованные поля без формата и с форматами чисел,
+    которые оператор % выводит так же, как str.format.
+    """
+    parts: List[str] = []
+    names: List[str] = []
+    for literal, name, spec, conversion in Formatter().parse(template):
+        parts.append(literal.replace('%', '%%'))
+        if name is None:
+            continue
+        if (conversion or not name.isidentifier()
+                or (spec and not PRINTF_SPEC.fullmatch(spec))):
+            raise ValueError(f'Неподдерживаемое поле шаблона: {name}')
+        parts.append('%' + (spec or 's'))
+        names.append(name)
+    return ''.join(parts), tuple(names)
+
+
+PROFILE_BUCKETS: Tuple[float, ...] = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5,
+                                      5e-5, 1e-4, 1e-3, 1e-2, 1e-1)
+
+
+class Profiler:
+    """Гистограммы времени этапов расчёта по типам тренировок."""
+
+    def __init__(self, buckets: Sequence[float] = PROFILE_BUCKETS) -> None:
+        import threading
+
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self._stats: Dict[Tuple[str, str], List[Any]] = {}
+        self._codes: Dict[str, str] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def _label(self, training_type: str) -> str:
+        """Перевести имя класса тренировки в код пакета."""
+        code = self._codes.get(training_type)
+        if code is None:
+            for code, training_class in TRAINING_TYPES.items():
+                self._codes[code] = self._codes[training_class.__name__] = code
+            code = self._codes.setdefault(training_type, training_type)
+        return code
+
+    def record(self, stage: str, training_type: str, seconds: float) -> None:
+        """Учесть время этапа для типа тренировки."""
+        key = (stage, self._label(training_type))
+        position = bisect_left(self.buckets, seconds)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = [0, 0.0,
+                                            [0] * (len(self.buckets) + 1)]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2][position] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Вернуть копию накопленных счётчиков и гистограмм."""
+        snapshot: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        with self._lock:
+            for (stage, code), (count, total, histogram) in sorted(
+                    self._stats.items()):
+                snapshot.setdefault(stage, {})[code] = {
+                    'count': count,
+                    'sum': total,
+                    'buckets': dict(zip(self.buckets + (float('inf'),),
+                                        accumulate(histogram))),
+                }
+        return snapshot
+
+    def to_prometheus(self, name: str = 'homework_stage_seconds') -> str:
+        """Вернуть гистограммы в текстовом формате Prometheus."""
+        lines: List[str] = [
+            f'# HELP {name} Время этапов расчёта тренировок.',
+            f'# TYPE {name} histogram',
+        ]
+        for stage, codes in self.snapshot().items():
+            for code, stats in codes.items():
+                labels = f'stage="{stage}",workout_type="{code}"'
+                for bound, observed in stats['buckets'].items():
+                    bound_label = '+Inf' if bound == float('inf') else bound
+                    lines.append(f'{name}_bucket{{{labels},'
+                                 f'le="{bound_label}"}} {observed}')
+                lines.append(f'{name}_sum{{{labels}}} {stats["sum"]!r}')
+                lines.append(f'{name}_count{{{labels}}} {stats["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str) -> None:
+        """Записать гистограммы в текстовый файл Prometheus."""
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.to_prometheus())
+
+    def reset(self) -> None:
+        """Сбросить накопленные данные."""
+        with self._lock:
+            self._stats.clear()
+
+
+_profiler: Optional[Profiler] = None
+
+
+def enable_profiling(profiler: Optional[Profiler] = None) -> Profiler:
+    """Включить замеры этапов расчёта и вернуть профилировщик."""
+    global _profiler
+    _profiler = profiler or Profiler()
+    return _profiler
+
+
+def disable_profiling() -> Optional[Profiler]:
+    """Выключить замеры и вернуть последний профилировщик."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+class Record:
+    """Запись с полями в __slots__, сравнением и представлением.
+
+    Заменяет dataclass, чтобы не загружать модуль dataclasses при запуске.
+    """
+
+    __slots__ = ()
+    __hash__ = None
+    _RECORD_FIELDS: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        fields: List[str] = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get('__slots__', ())
+            fields.extend((slots,) if isinstance(slots, str) else slots)
+        cls._RECORD_FIELDS = tuple(
+            name for name in fields if name not in ('__dict__', '__weakref__')
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name)
+                   for name in self._RECORD_FIELDS)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}'
+                           for name in self._RECORD_FIELDS)
+        return f'{self.__class__.__name__}({fields})'
+
+
+class InfoMessage(Record):
     """Информационное сообщение о тренировке."""
 
-    training_type: str
-    duration: float
-    distance: float
-    speed: float
-    calories: float
+    __slots__ = ('training_type', 'duration', 'distance', 'speed', 'calories')
 
     OUTPUT = ('Тип тренировки: {training_type}; '
               'Длительность: {duration:.3f} ч.; '
@@ -18,68 +180,299 @@ class InfoMessage:
               'Ср. скорость: {speed:.3f} км/ч; '
               'Потрачено ккал: {calories:.3f}.')
 
+    def __init__(self,
+                 training_type: str,
+                 duration: float,
+                 distance: float,
+                 speed: float,
+                 calories: float
+                 ) -> None:
+        self.training_type: str = training_type
+        self.duration: float = duration
+        self.distance: float = distance
+        self.speed: float = speed
+        self.calories: float = calories
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._compile_output()
+
+    @classmethod
+    def _compile_output(cls) -> None:
+        try:
+            cls._TEMPLATE, cls._FIELD_NAMES = compile_template(cls.OUTPUT)
+        except ValueError:
+            cls._TEMPLATE, cls._FIELD_NAMES = '%s', ()
+            cls._FORMAT_FALLBACK = True
+            cls._get_fields = staticmethod(lambda message: (
+                message.OUTPUT.format(**{
+                    name: getattr(message, name)
+                    for name in message._RECORD_FIELDS
+                }),
+            ))
+            return
+        cls._FORMAT_FALLBACK = False
+        if cls._FIELD_NAMES:
+            cls._get_fields = attrgetter(*cls._FIELD_NAMES)
+        else:
+            cls._get_fields = staticmethod(lambda message: ())
+
     def get_message(self) -> str:
         """Вывод результата тренировки"""
-        return self.OUTPUT.format(**asdict(self))
+        if _profiler is None:
+            return self._TEMPLATE % self._get_fields(self)
+        start: float = perf_counter()
+        message: str = self._TEMPLATE % self._get_fields(self)
+        _profiler.record('message', self.training_type, perf_counter() - start)
+        return message
+
+
+InfoMessage._compile_output()
+
+
+Columns = Dict[str, Sequence[float]]
+# Флаги CO_VARARGS и CO_VARKEYWORDS объекта кода.
+VARIADIC_FLAGS: int = 0x04 | 0x08
+NUMBER_TYPES: Tuple[type, ...] = (int, float)
+PROFILE_TOLERANCE: float = 1e-12
+
+TRAINING_TYPES: Dict[str, Type['Training']] = {}
+TRAINING_PARAMS: Dict[str, Tuple[str, ...]] = {}
+
+
+def get_training_params(training_class: Type['Training']) -> Tuple[str, ...]:
+    """Получить имена параметров конструктора тренировки."""
+    code = training_class.__init__.__code__
+    if code.co_flags & VARIADIC_FLAGS or code.co_kwonlyargcount:
+        raise TypeError('Конструктор тренировки должен принимать '
+                        'только позиционные параметры')
+    return code.co_varnames[1:code.co_argcount]
+
+
+BATCH_METHODS: Tuple[str, ...] = ('get_distance', 'get_mean_speed',
+                                  'get_spent_calories')
+
+
+def _defining_class(training_class: type, name: str) -> type:
+    """Найти класс, в котором определён атрибут."""
+    return next(klass for klass in training_class.__mro__
+                if name in klass.__dict__)
+
+
+def check_batch_methods(training_class: Type['Training']) -> None:
+    """Проверить, что пакетные методы переопределены вместе с обычными."""
+    for name in BATCH_METHODS:
+        if not issubclass(_defining_class(training_class, name + '_batch'),
+                          _defining_class(training_class, name)):
+            raise TypeError(f'Класс {training_class.__name__} '
+                            f'переопределяет {name} без {name}_batch')
+
+
+def register_training(workout_type: str
+                      ) -> Callable[[Type['Training']], Type['Training']]:
+    """Зарегистрировать класс тренировки под кодом пакета."""
+    def register(training_class: Type[Training]) -> Type[Training]:
+        if not issubclass(training_class, Training):
+            raise TypeError('Класс должен наследоваться от Training')
+        if workout_type in TRAINING_TYPES:
+            raise ValueError(f'Код {workout_type} уже зарегистрирован')
+        check_batch_methods(training_class)
+        TRAINING_PARAMS[workout_type] = get_training_params(training_class)
+        TRAINING_TYPES[workout_type] = training_class
+        return training_class
+    return register
+
+
+def unregister_training(workout_type: str) -> Type['Training']:
+    """Удалить класс тренировки из реестра."""
+    del TRAINING_PARAMS[workout_type]
+    return TRAINING_TYPES.pop(workout_type)
+
+
+def training_field(name: str) -> property:
+    """Параметр тренировки, сбрасывающий кэш показателей при изменении."""
+    slot: str = '_' + name
+
+    def set_value(self: 'Training', value: float) -> None:
+        setattr(self, slot, value)
+        self._distance = self._speed = self._calories = None
+
+    return property(attrgetter(slot), set_value)
+
+
+class instance_override:
+    """Метод, который можно подменить у экземпляра без __dict__.
+
+    Подмены хранятся в дескрипторе, пока их не удалят через del или не
+    вернут исходный метод присваиванием.
+    """
+
+    def __init__(self, func: Callable[..., Any]) -> None:
+        self.func: Callable[..., Any] = func
+        self.__doc__ = func.__doc__
+        self.overrides: Dict[Any, Callable[..., Any]] = {}
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Any:
+        if instance is None:
+            return self.func
+        override = self.overrides.get(instance) if self.overrides else None
+        if override is None:
+            return self.func.__get__(instance, owner)
+        return override
+
+    def __set__(self, instance: Any, value: Callable[..., Any]) -> None:
+        if (getattr(value, '__func__', None) is self.func
+                and value.__self__ is instance):
+            self.overrides.pop(instance, None)
+        else:
+            self.overrides[instance] = value
+
+    def __delete__(self, instance: Any) -> None:
+        if self.overrides.pop(instance, None) is None:
+            raise AttributeError(self.func.__name__)
+
 
 class Training:
-    """Базовый класс тренировки."""
+    """Базовый класс тренировки.
+
+    Дистанция, скорость и калории вычисляются не больше одного раза
+    и пересчитываются после изменения параметров тренировки.
+    """
+
+    __slots__ = ('_action', '_duration', '_weight',
+                 '_distance', '_speed', '_calories')
+
+    action: property = training_field('action')
+    duration: property = training_field('duration')
+    weight: property = training_field('weight')
 
     LEN_STEP: float = 0.65
     M_IN_KM: int = 1000
     MIN_IN_HOUR: int = 60
+    NONZERO_PARAMS: Tuple[str, ...] = ('duration',)
 
     def __init__(self,
                  action: int,
                  duration: float,
                  weight: float,
                  ) -> None:
-        self.action: int = action
-        self.duration: float = duration
-        self.weight: float = weight
+        self._action: int = action
+        self._duration: float = duration
+        self._weight: float = weight
+        self._distance: Optional[float] = None
+        self._speed: Optional[float] = None
+        self._calories: Optional[float] = None
 
     def get_distance(self) -> float:
         """Получить дистанцию в км."""
-        return self.action * self.LEN_STEP / self.M_IN_KM
+        distance = self._distance
+        if distance is None:
+            distance = self._distance = (self.action * self.LEN_STEP
+                                         / self.M_IN_KM)
+        return distance
 
     def get_mean_speed(self) -> float:
         """Получить среднюю скорость движения."""
-        return self.get_distance() / self.duration
+        speed = self._speed
+        if speed is None:
+            speed = self._speed = self.get_distance() / self.duration
+        return speed
 
+    @instance_override
     def get_spent_calories(self) -> float:
         """Получить количество затраченных калорий."""
         raise NotImplementedError
 
     def show_training_info(self) -> InfoMessage:
         """Вернуть информационное сообщение о выполненной тренировке."""
+        if _profiler is None:
+            calories: float = self.get_spent_calories()
+        else:
+            start: float = perf_counter()
+            calories = self.get_spent_calories()
+            _profiler.record('calories', self.__class__.__name__,
+                             perf_counter() - start)
         return InfoMessage(self.__class__.__name__,
                            self.duration,
                            self.get_distance(),
                            self.get_mean_speed(),
-                           self.get_spent_calories()
+                           calories
                            )
 
+    @classmethod
+    def get_distance_batch(cls, columns: 'Columns') -> List[float]:
+        """Получить дистанции в км для столбцов пакета."""
+        len_step: float = cls.LEN_STEP
+        m_in_km: int = cls.M_IN_KM
+        return [action * len_step / m_in_km for action in columns['action']]
+
+    @classmethod
+    def get_mean_speed_batch(cls,
+                             columns: 'Columns',
+                             distance: List[float]
+                             ) -> List[float]:
+        """Получить средние скорости для столбцов пакета."""
+        return [dist / duration
+                for dist, duration in zip(distance, columns['duration'])]
 
+    @classmethod
+    def get_spent_calories_batch(cls,
+                                 columns: 'Columns',
+                                 speed: List[float]
+                                 ) -> List[float]:
+        """Получить затраченные калории для столбцов пакета."""
+        raise NotImplementedError
+
+
+@register_training('RUN')
 class Running(Training):
     """Тренировка: бег."""
 
+    __slots__ = ()
+
     index_calorie_1: int = 18
     index_calorie_2: int = 20
 
     def get_spent_calories(self) -> float:
         """Получить количество затраченных калорий."""
-        mean_speed: float = self.get_mean_speed()
-        time_training_min: float = self.duration * self.MIN_IN_HOUR
-        return ((self.index_calorie_1 * mean_speed
+        calories = self._calories
+        if calories is None:
+            mean_speed: float = self.get_mean_speed()
+            time_training_min: float = self.duration * self.MIN_IN_HOUR
+            calories = self._calories = (
+                (self.index_calorie_1 * mean_speed
                  - self.index_calorie_2) * self.weight
-                / self.M_IN_KM * time_training_min)
+                / self.M_IN_KM * time_training_min
+            )
+        return calories
+
+    @classmethod
+    def get_spent_calories_batch(cls,
+                                 columns: 'Columns',
+                                 speed: List[float]
+                                 ) -> List[float]:
+        """Получить затраченные калории для столбцов пакета."""
+        index_1: int = cls.index_calorie_1
+        index_2: int = cls.index_calorie_2
+        m_in_km: int = cls.M_IN_KM
+        min_in_hour: int = cls.MIN_IN_HOUR
+        return [(index_1 * mean_speed - index_2) * weight
+                / m_in_km * (duration * min_in_hour)
+                for mean_speed, weight, duration
+                in zip(speed, columns['weight'], columns['duration'])]
 
 
+@register_training('WLK')
 class SportsWalking(Training):
     """Тренировка: спортивная ходьба."""
 
+    __slots__ = ('_height',)
+
+    height: property = training_field('height')
+
     index_calorie_3: float = 0.035
     index_calorie_4: float = 0.029
+    NONZERO_PARAMS: Tuple[str, ...] = ('duration', 'height')
 
     def __init__(self,
                  action: int,
@@ -88,20 +481,46 @@ class SportsWalking(Training):
                  height: float
                  ) -> None:
         super().__init__(action, duration, weight)
-        self.height: float = height
+        self._height: float = height
 
     def get_spent_calories(self) -> float:
         """Получить количество затраченных калорий."""
-        part_1: float = self.index_calorie_3 * self.weight
-        part_2: float = self.get_mean_speed() ** 2 // self.height
-        part_3: float = self.index_calorie_4 * self.weight
-        time_training_min: float = self.duration * self.MIN_IN_HOUR
-        return (part_1 + part_2 * part_3) * time_training_min
+        calories = self._calories
+        if calories is None:
+            part_1: float = self.index_calorie_3 * self.weight
+            part_2: float = self.get_mean_speed() ** 2 // self.height
+            part_3: float = self.index_calorie_4 * self.weight
+            time_training_min: float = self.duration * self.MIN_IN_HOUR
+            calories = self._calories = ((part_1 + part_2 * part_3)
+                                         * time_training_min)
+        return calories
+
+    @classmethod
+    def get_spent_calories_batch(cls,
+                                 columns: 'Columns',
+                                 speed: List[float]
+                                 ) -> List[float]:
+        """Получить затраченные калории для столбцов пакета."""
+        index_3: float = cls.index_calorie_3
+        index_4: float = cls.index_calorie_4
+        min_in_hour: int = cls.MIN_IN_HOUR
+        return [(index_3 * weight
+                 + mean_speed ** 2 // height * (index_4 * weight))
+                * (duration * min_in_hour)
+                for mean_speed, weight, height, duration
+                in zip(speed, columns['weight'], columns['height'],
+                       columns['duration'])]
 
 
+@register_training('SWM')
 class Swimming(Training):
     """Тренировка: плавание."""
 
+    __slots__ = ('_length_pool', '_count_pool')
+
+    length_pool: property = training_field('length_pool')
+    count_pool: property = training_field('count_pool')
+
     LEN_STEP: float = 1.38
     index_calorie_5: float = 1.1
     index_calorie_6: float = 2.0
@@ -114,29 +533,1607 @@ class Swimming(Training):
                  count_pool: int
                  ) -> None:
         super().__init__(action, duration, weight)
-        self.length_pool: float = length_pool
-        self.count_pool: int = count_pool
+        self._length_pool: float = length_pool
+        self._count_pool: int = count_pool
 
     def get_mean_speed(self) -> float:
         """Получить среднюю скорость движения."""
-        swam: float = self.length_pool * self.count_pool
-        return swam / self.M_IN_KM / self.duration
+        speed = self._speed
+        if speed is None:
+            swam: float = self.length_pool * self.count_pool
+            speed = self._speed = swam / self.M_IN_KM / self.duration
+        return speed
 
     def get_spent_calories(self) -> float:
         """Получить количество затраченных калорий."""
-        part_1: float = self.get_mean_speed() + self.index_calorie_5
-        part_2: float = self.index_calorie_6 * self.weight
-        return part_1 * part_2
+        calories = self._calories
+        if calories is None:
+            part_1: float = self.get_mean_speed() + self.index_calorie_5
+            part_2: float = self.index_calorie_6 * self.weight
+            calories = self._calories = part_1 * part_2
+        return calories
+
+    @classmethod
+    def get_mean_speed_batch(cls,
+                             columns: 'Columns',
+                             distance: List[float]
+                             ) -> List[float]:
+        """Получить средние скорости для столбцов пакета."""
+        m_in_km: int = cls.M_IN_KM
+        return [length_pool * count_pool / m_in_km / duration
+                for length_pool, count_pool, duration
+                in zip(columns['length_pool'], columns['count_pool'],
+                       columns['duration'])]
+
+    @classmethod
+    def get_spent_calories_batch(cls,
+                                 columns: 'Columns',
+                                 speed: List[float]
+                                 ) -> List[float]:
+        """Получить затраченные калории для столбцов пакета."""
+        index_5: float = cls.index_calorie_5
+        index_6: float = cls.index_calorie_6
+        return [(mean_speed + index_5) * (index_6 * weight)
+                for mean_speed, weight in zip(speed, columns['weight'])]
+
+
+class BatchResult(Record):
+    """Результаты расчёта пакета тренировок по столбцам."""
+
+    __slots__ = ('training_type', 'duration', 'distance', 'speed', 'calories')
+
+    def __init__(self,
+                 training_type: List[str],
+                 duration: array,
+                 distance: array,
+                 speed: array,
+                 calories: array
+                 ) -> None:
+        self.training_type: List[str] = training_type
+        self.duration: array = duration
+        self.distance: array = distance
+        self.speed: array = speed
+        self.calories: array = calories
+
+    def __len__(self) -> int:
+        return len(self.training_type)
+
+    def get_info(self, index: int) -> InfoMessage:
+        """Вернуть информационное сообщение для строки пакета."""
+        return InfoMessage(self.training_type[index],
+                           self.duration[index],
+                           self.distance[index],
+                           self.speed[index],
+                           self.calories[index]
+                           )
+
+
+class TrainingArray:
+    """Тренировки одного типа, хранящиеся по столбцам."""
+
+    __slots__ = ('training_class', 'columns')
+
+    def __init__(self,
+                 training_class: Type[Training],
+                 rows: Iterable[Sequence[float]] = ()
+                 ) -> None:
+        self.training_class: Type[Training] = training_class
+        self.columns: Dict[str, array] = {
+            name: array('d') for name in get_training_params(training_class)
+        }
+        for row in rows:
+            self.append(*row)
+
+    def __len__(self) -> int:
+        return len(self.columns['action'])
+
+    def __getitem__(self, index: int) -> Training:
+        return self.training_class(
+            *(column[index] for column in self.columns.values())
+        )
+
+    def append(self, *data: float) -> None:
+        """Добавить тренировку в конец набора."""
+        if len(data) != len(self.columns):
+            raise ValueError('Неверное количество параметров тренировки')
+        for column, value in zip(self.columns.values(), data):
+            column.append(value)
+
+    def get_distance(self,
+                     index: Optional[int] = None
+                     ) -> Union[float, array]:
+        """Получить дистанцию в км для строки или всего набора."""
+        if index is not None:
+            return self[index].get_distance()
+        return array('d', self.training_class.get_distance_batch(
+            self.columns
+        ))
+
+    def get_mean_speed(self,
+                       index: Optional[int] = None
+                       ) -> Union[float, array]:
+        """Получить среднюю скорость для строки или всего набора."""
+        if index is not None:
+            return self[index].get_mean_speed()
+        return array('d', self._get_mean_speed_batch())
+
+    def get_spent_calories(self,
+                           index: Optional[int] = None
+                           ) -> Union[float, array]:
+        """Получить затраченные калории для строки или всего набора."""
+        if index is not None:
+            return self[index].get_spent_calories()
+        return array('d', self.training_class.get_spent_calories_batch(
+            self.columns, self._get_mean_speed_batch()
+        ))
+
+    def show_training_info(self,
+                           index: Optional[int] = None
+                           ) -> Union[InfoMessage, BatchResult]:
+        """Вернуть сообщение для строки или результаты всего набора."""
+        if index is not None:
+            return self[index].show_training_info()
+        training_class = self.training_class
+        distance = training_class.get_distance_batch(self.columns)
+        speed = training_class.get_mean_speed_batch(self.columns, distance)
+        calories = training_class.get_spent_calories_batch(self.columns,
+                                                           speed)
+        return BatchResult([training_class.__name__] * len(self),
+                           array('d', self.columns['duration']),
+                           array('d', distance),
+                           array('d', speed),
+                           array('d', calories)
+                           )
+
+    def _get_mean_speed_batch(self) -> List[float]:
+        training_class = self.training_class
+        return training_class.get_mean_speed_batch(
+            self.columns, training_class.get_distance_batch(self.columns)
+        )
+
+
+def group_rows(workout_types: Sequence[str]) -> Dict[str, List[int]]:
+    """Сгруппировать номера строк пакета по коду тренировки."""
+    groups: Dict[str, List[int]] = {}
+    for index, workout_type in enumerate(workout_types):
+        rows = groups.get(workout_type)
+        if rows is None:
+            if workout_type not in TRAINING_TYPES:
+                raise ValueError('Такой тренировки нету')
+            rows = groups[workout_type] = []
+        rows.append(index)
+    return groups
+
+
+class AthleteProfile:
+    """Постоянные части формул калорий для одного спортсмена.
+
+    Для бега множитель weight / M_IN_KM вычисляется заранее, поэтому
+    калории бега могут отличаться от расчёта Running в последнем знаке
+    (относительная погрешность не больше PROFILE_TOLERANCE). Остальные
+    тренировки совпадают с расчётом классов точно.
+    """
+
+    __slots__ = ('weight', 'height', 'running_factor', 'walking_base',
+                 'walking_factor', 'swimming_factor')
+
+    def __init__(self, weight: float, height: Optional[float] = None) -> None:
+        self.weight: float = weight
+        self.height: Optional[float] = height
+        self.running_factor: float = weight / Running.M_IN_KM
+        self.walking_base: float = SportsWalking.index_calorie_3 * weight
+        self.walking_factor: float = SportsWalking.index_calorie_4 * weight
+        self.swimming_factor: float = Swimming.index_calorie_6 * weight
+
+    def calculate(self,
+                  workout_types: Sequence[str],
+                  action: Sequence[float],
+                  duration: Sequence[float],
+                  **columns: Sequence[float]
+                  ) -> BatchResult:
+        """Рассчитать тренировки спортсмена по столбцам без веса и роста."""
+        size: int = len(workout_types)
+        columns.update(action=action, duration=duration,
+                       weight=[self.weight] * size)
+        if self.height is not None:
+            columns.setdefault('height', [self.height] * size)
+        return _calculate_groups(size, (
+            (workout_type, rows,
+             _select_rows(columns, TRAINING_PARAMS[workout_type], rows, size))
+            for workout_type, rows in group_rows(workout_types).items()
+        ), self.get_spent_calories_batch)
+
+    def get_spent_calories_batch(self,
+                                 training_class: Type[Training],
+                                 columns: Columns,
+                                 speed: List[float]
+                                 ) -> List[float]:
+        """Получить калории группы через заранее вычисленные множители."""
+        if training_class is Running:
+            index_1: int = Running.index_calorie_1
+            index_2: int = Running.index_calorie_2
+            factor: float = self.running_factor
+            return [(index_1 * mean_speed - index_2) * factor
+                    * (hours * Running.MIN_IN_HOUR)
+                    for mean_speed, hours in zip(speed, columns['duration'])]
+        if training_class is SportsWalking:
+            base: float = self.walking_base
+            factor = self.walking_factor
+            return [(base + mean_speed ** 2 // height * factor)
+                    * (hours * SportsWalking.MIN_IN_HOUR)
+                    for mean_speed, height, hours
+                    in zip(speed, columns['height'], columns['duration'])]
+        if training_class is Swimming:
+            index_5: float = Swimming.index_calorie_5
+            factor = self.swimming_factor
+            return [(mean_speed + index_5) * factor for mean_speed in speed]
+        return training_class.get_spent_calories_batch(columns, speed)
+
+
+def _reject(rejected: Optional[List[Tuple[int, str]]],
+            index: int,
+            reason: str
+            ) -> None:
+    """Отклонить строку пакета или сразу сообщить об ошибке."""
+    if rejected is None:
+        raise ValueError(reason)
+    rejected.append((index, reason))
+
+
+def group_packages(packages: Iterable[Tuple[str, Sequence[float]]],
+                   rejected: Optional[List[Tuple[int, str]]] = None
+                   ) -> Dict[str, Tuple[List[int], Columns]]:
+    """Разложить пакеты по типам тренировок за один проход.
+
+    Для каждого кода возвращает номера строк и столбцы параметров.
+    Если передан список rejected, пакеты неизвестного типа или
+    неверной длины записываются в него вместо ValueError.
+    """
+    groups: Dict[str, Tuple[List[int], List[List[float]]]] = {}
+    for index, package in enumerate(packages):
+        try:
+            workout_type, data = package
+        except (TypeError, ValueError):
+            _reject(rejected, index,
+                    'Пакет должен состоять из кода и параметров')
+            continue
+        if not isinstance(workout_type, str):
+            workout_type = None
+        group = groups.get(workout_type)
+        if group is None:
+            if workout_type not in TRAINING_PARAMS:
+                _reject(rejected, index, 'Такой тренировки нету')
+                continue
+            group = groups[workout_type] = (
+                [], [[] for _ in TRAINING_PARAMS[workout_type]]
+            )
+        rows, columns = group
+        if not isinstance(data, Sized):
+            _reject(rejected, index,
+                    'Параметры тренировки должны быть списком')
+            continue
+        if len(data) != len(columns):
+            _reject(rejected, index,
+                    'Неверное количество параметров тренировки')
+            continue
+        rows.append(index)
+        for column, value in zip(columns, data):
+            column.append(value)
+    return {workout_type: (rows, dict(zip(TRAINING_PARAMS[workout_type],
+                                          columns)))
+            for workout_type, (rows, columns) in groups.items()}
+
+
+def _select_rows(columns: Columns,
+                 params: Sequence[str],
+                 rows: List[int],
+                 size: int
+                 ) -> Columns:
+    """Выбрать строки группы из общих столбцов."""
+    if len(rows) == size:
+        return {name: columns[name] for name in params}
+    return {name: [columns[name][row] for row in rows] for name in params}
+
+
+def _calculate_groups(size: int,
+                      groups: Iterable[Tuple[str, List[int], Columns]],
+                      get_calories: Optional[Callable[..., List[float]]] = None
+                      ) -> BatchResult:
+    """Рассчитать группы одного типа и собрать общий результат.
+
+    get_calories(training_class, columns, speed) заменяет расчёт
+    калорий классом тренировки.
+    """
+    names: List[str] = [''] * size
+    duration: array = array('d', [0.0]) * size
+    distance: array = array('d', [0.0]) * size
+    speed: array = array('d', [0.0]) * size
+    calories: array = array('d', [0.0]) * size
+    for workout_type, rows, group in groups:
+        start: float = perf_counter()
+        training_class = TRAINING_TYPES[workout_type]
+        name: str = training_class.__name__
+        group_distance = training_class.get_distance_batch(group)
+        group_speed = training_class.get_mean_speed_batch(group,
+                                                          group_distance)
+        if get_calories is None:
+            group_calories = training_class.get_spent_calories_batch(
+                group, group_speed
+            )
+        else:
+            group_calories = get_calories(training_class, group, group_speed)
+        for row, hours, dist, mean_speed, spent in zip(
+                rows, group['duration'], group_distance, group_speed,
+                group_calories):
+            names[row] = name
+            duration[row] = hours
+            distance[row] = dist
+            speed[row] = mean_speed
+            calories[row] = spent
+        if _profiler is not None:
+            _profiler.record('batch', workout_type, perf_counter() - start)
+    return BatchResult(names, duration, distance, speed, calories)
+
+
+def calculate_batch(workout_types: Sequence[str],
+                    action: Sequence[float],
+                    duration: Sequence[float],
+                    weight: Sequence[float],
+                    **columns: Sequence[float]
+                    ) -> BatchResult:
+    """Рассчитать показатели для столбцов пакета тренировок."""
+    columns.update(action=action, duration=duration, weight=weight)
+    size: int = len(workout_types)
+    return _calculate_groups(size, (
+        (workout_type, rows,
+         _select_rows(columns, TRAINING_PARAMS[workout_type], rows, size))
+        for workout_type, rows in group_rows(workout_types).items()
+    ))
+
+
+def read_package_batch(packages: Sequence[Tuple[str, Sequence[float]]]
+                       ) -> BatchResult:
+    """Рассчитать показатели для списка пакетов от датчиков."""
+    return _calculate_groups(len(packages), (
+        (workout_type, rows, columns)
+        for workout_type, (rows, columns)
+        in group_packages(packages).items()
+    ))
+
+
+class ValidationReport(Record):
+    """Итог проверки пакета: допустимые и отклонённые строки."""
+
+    __slots__ = ('valid', 'rejected')
+
+    def __init__(self,
+                 valid: List[int],
+                 rejected: List[Tuple[int, str]]
+                 ) -> None:
+        self.valid: List[int] = valid
+        self.rejected: List[Tuple[int, str]] = rejected
+
+    def select(self, items: Sequence[Any]) -> List[Any]:
+        """Выбрать допустимые строки из исходной последовательности."""
+        return [items[row] for row in self.valid]
+
+
+def _check_columns(training_class: Type[Training],
+                   rows: List[int],
+                   columns: Columns,
+                   rejected: List[Tuple[int, str]]
+                   ) -> None:
+    """Проверить столбцы группы одного типа тренировки."""
+    for name, column in columns.items():
+        rejected.extend(
+            (row, f'Нечисловое значение {name}')
+            for row, value in zip(rows, column)
+            if not isinstance(value, NUMBER_TYPES)
+        )
+        if name in training_class.NONZERO_PARAMS:
+            rejected.extend(
+                (row, f'Нулевое значение {name}')
+                for row, value in zip(rows, column) if not value
+            )
+
+
+def _build_report(size: int,
+                  rejected: List[Tuple[int, str]]
+                  ) -> ValidationReport:
+    """Собрать отчёт по списку отклонённых строк."""
+    rejected.sort()
+    bad = {row for row, _ in rejected}
+    return ValidationReport([row for row in range(size) if row not in bad],
+                            rejected)
+
+
+def validate_packages(packages: Sequence[Tuple[str, Sequence[float]]]
+                      ) -> ValidationReport:
+    """Проверить список пакетов без исключений для каждой строки."""
+    rejected: List[Tuple[int, str]] = []
+    for workout_type, (rows, columns) in group_packages(
+            packages, rejected).items():
+        _check_columns(TRAINING_TYPES[workout_type], rows, columns,
+                       rejected)
+    return _build_report(len(packages), rejected)
+
+
+def validate_batch(workout_types: Sequence[str],
+                   action: Sequence[float],
+                   duration: Sequence[float],
+                   weight: Sequence[float],
+                   **columns: Sequence[float]
+                   ) -> ValidationReport:
+    """Проверить столбцы пакета без исключений для каждой строки."""
+    columns.update(action=action, duration=duration, weight=weight)
+    size: int = len(workout_types)
+    groups: Dict[str, List[int]] = {}
+    for index, workout_type in enumerate(workout_types):
+        groups.setdefault(workout_type, []).append(index)
+    rejected: List[Tuple[int, str]] = []
+    for workout_type, rows in groups.items():
+        if workout_type not in TRAINING_PARAMS:
+            rejected.extend((row, 'Такой тренировки нету') for row in rows)
+            continue
+        _check_columns(TRAINING_TYPES[workout_type], rows,
+                       _select_rows(columns, TRAINING_PARAMS[workout_type],
+                                    rows, size),
+                       rejected)
+    return _build_report(size, rejected)
+
+
+def iter_chunks(items: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    """Разбить поток на списки длиной не больше chunk_size."""
+    if chunk_size < 1:
+        raise ValueError('Размер куска должен быть положительным')
+    return _iter_chunks(iter(items), chunk_size)
+
+
+def _iter_chunks(iterator: Iterator[Any],
+                 chunk_size: int
+                 ) -> Iterator[List[Any]]:
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+RESULT_FIELDS: Tuple[str, ...] = ('training_type', 'duration', 'distance',
+                                  'speed', 'calories')
+
+
+def iter_package_results(packages: Iterable[Tuple[str, Sequence[float]]],
+                         fields: Sequence[str] = RESULT_FIELDS,
+                         chunk_size: int = 1024
+                         ) -> Iterator[Tuple[Any, ...]]:
+    """Лениво рассчитать выбранные поля для потока пакетов."""
+    unknown = set(fields) - set(RESULT_FIELDS)
+    if unknown:
+        raise ValueError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    for chunk in iter_chunks(packages, chunk_size):
+        result = read_package_batch(chunk)
+        yield from zip(*(getattr(result, field) for field in fields))
+
+
+def process_packages_parallel(packages: Iterable[Tuple[str, Sequence[float]]],
+                              max_workers: Optional[int] = None,
+                              chunk_size: int = 10000,
+                              ordered: bool = True
+                              ) -> Iterator[Tuple[int, BatchResult]]:
+    """Рассчитать поток пакетов в пуле процессов.
+
+    Возвращает пары (номер первой строки куска, результаты куска).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers: int = max_workers or os.cpu_count() or 1
+    window: int = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Dict['Future', int] = {}
+        offset: int = 0
+        for chunk in iter_chunks(packages, chunk_size):
+            pending[executor.submit(read_package_batch, chunk)] = offset
+            offset += len(chunk)
+            if len(pending) >= window:
+                yield from _collect_futures(pending, ordered)
+        while pending:
+            yield from _collect_futures(pending, ordered)
+
+
+def _collect_futures(pending: Dict['Future', int],
+                     ordered: bool
+                     ) -> Iterator[Tuple[int, BatchResult]]:
+    """Забрать готовые результаты из очереди задач пула."""
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    if ordered:
+        done = [next(iter(pending))]
+    else:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        yield pending.pop(future), future.result()
+
+
+SHARED_COLUMNS: Tuple[str, ...] = ('distance', 'speed', 'calories')
+
+
+class SharedResult:
+    """Столбцы результатов в разделяемой памяти.
+
+    Процессы пула пишут distance, speed и calories прямо в сегменты по
+    номерам строк, родитель читает их как memoryview без копирования.
+    Сегменты принадлежат родителю и удаляются в close().
+    """
+
+    def __init__(self, size: int) -> None:
+        from multiprocessing import shared_memory
+
+        self.size: int = size
+        self._segments: List[Any] = []
+        self._views: List[memoryview] = []
+        try:
+            for _ in SHARED_COLUMNS:
+                self._segments.append(
+                    shared_memory.SharedMemory(create=True,
+                                               size=max(size * 8, 8))
+                )
+        except Exception:
+            self.close()
+            raise
+        self.names: Tuple[str, ...] = tuple(segment.name
+                                            for segment in self._segments)
+        for name, segment in zip(SHARED_COLUMNS, self._segments):
+            view = segment.buf[:size * 8]
+            self._views.append(view)
+            self._views.append(view.cast('d'))
+            setattr(self, name, self._views[-1])
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __enter__(self) -> 'SharedResult':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Освободить представления и удалить сегменты памяти."""
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments.clear()
+
+
+def _calculate_shared(names: Sequence[str],
+                      offset: int,
+                      packages: Sequence[Tuple[str, Sequence[float]]]
+                      ) -> int:
+    """Рассчитать кусок пакетов и записать его в разделяемую память."""
+    from multiprocessing import shared_memory
+
+    result = read_package_batch(packages)
+    start: int = offset * 8
+    end: int = start + len(result) * 8
+    for name, field in zip(names, SHARED_COLUMNS):
+        segment = shared_memory.SharedMemory(name=name)
+        try:
+            with memoryview(getattr(result, field)) as column:
+                segment.buf[start:end] = column.cast('B')
+        finally:
+            segment.close()
+    return len(result)
+
+
+def process_packages_shared(packages: Sequence[Tuple[str, Sequence[float]]],
+                            max_workers: Optional[int] = None,
+                            chunk_size: int = 10000
+                            ) -> SharedResult:
+    """Рассчитать пакеты в пуле процессов с выводом в разделяемую память.
+
+    Вызывающий код закрывает результат через close() или with.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    shared = SharedResult(len(packages))
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_calculate_shared, shared.names, offset,
+                                packages[offset:offset + chunk_size])
+                for offset in range(0, len(packages), chunk_size)
+            ]
+            for future in futures:
+                future.result()
+    except BaseException:
+        shared.close()
+        raise
+    return shared
+
+
+PACKAGE_MAGIC: bytes = b'HWPK'
+PACKAGE_VERSION: int = 2
+PACKAGE_HEADER: struct.Struct = struct.Struct('<4sHHQ')
+PACKAGE_CODE_SIZE: int = 4
+PACKAGE_FIELDS: Dict[str, str] = {'action': 'd',
+                                  'duration': 'd',
+                                  'weight': 'd',
+                                  'height': 'd',
+                                  'length_pool': 'd',
+                                  'count_pool': 'd'}
+
+
+def _align(offset: int) -> int:
+    """Выровнять смещение по границе 8 байт."""
+    return (offset + 7) & ~7
+
+
+def _encode_codes(codes: Iterable[str]) -> bytes:
+    """Упаковать таблицу кодов тренировок."""
+    table: List[bytes] = []
+    for code in codes:
+        encoded = code.encode('ascii')
+        if len(encoded) > PACKAGE_CODE_SIZE:
+            raise ValueError(f'Код {code} длиннее {PACKAGE_CODE_SIZE} байт')
+        table.append(encoded.ljust(PACKAGE_CODE_SIZE, b'\0'))
+    return b''.join(table)
+
+
+def write_package_file(path: str,
+                       packages: Sequence[Tuple[str, Sequence[float]]]
+                       ) -> None:
+    """Записать пакеты в двоичный файл по столбцам."""
+    size: int = len(packages)
+    type_index: array = array('B', [0]) * size
+    columns: Dict[str, array] = {
+        name: array(type_code, [0]) * size
+        for name, type_code in PACKAGE_FIELDS.items()
+    }
+    groups = group_packages(packages)
+    for number, (rows, group) in enumerate(groups.values()):
+        for name, values in group.items():
+            if name not in columns:
+                raise ValueError(f'Поле {name} не входит в формат файла')
+            column = columns[name]
+            for row, value in zip(rows, values):
+                column[row] = value
+        for row in rows:
+            type_index[row] = number
+    if sys.byteorder != 'little':
+        for column in columns.values():
+            column.byteswap()
+    with open(path, 'wb') as file:
+        file.write(PACKAGE_HEADER.pack(PACKAGE_MAGIC, PACKAGE_VERSION,
+                                       len(groups), size))
+        file.write(_encode_codes(groups))
+        file.write(b'\0' * (_align(file.tell()) - file.tell()))
+        file.write(type_index.tobytes())
+        file.write(b'\0' * (_align(file.tell()) - file.tell()))
+        for column in columns.values():
+            file.write(column.tobytes())
+
+
+class TypeCodeColumn:
+    """Столбец кодов тренировок поверх номеров из таблицы кодов."""
+
+    __slots__ = ('codes', 'index')
+
+    def __init__(self, codes: Sequence[str], index: Sequence[int]) -> None:
+        self.codes: Sequence[str] = codes
+        self.index: Sequence[int] = index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, row: int) -> str:
+        return self.codes[self.index[row]]
+
+    def __iter__(self) -> Iterator[str]:
+        return map(self.codes.__getitem__, self.index)
+
+
+class PackageFile:
+    """Двоичный файл пакетов, отображённый в память.
+
+    Столбцы доступны как memoryview без копирования данных.
+    """
+
+    def __init__(self, path: str) -> None:
+        import mmap
+
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        try:
+            self._map_columns()
+        except Exception:
+            self.close()
+            raise
+
+    def _map_columns(self) -> None:
+        buffer = self._view(memoryview(self._mmap))
+        if len(buffer) < PACKAGE_HEADER.size:
+            raise ValueError('Файл пакетов повреждён')
+        magic, version, code_count, size = PACKAGE_HEADER.unpack_from(buffer)
+        if magic != PACKAGE_MAGIC or version != PACKAGE_VERSION:
+            raise ValueError('Неподдерживаемый формат файла пакетов')
+        offset: int = PACKAGE_HEADER.size
+        self.codes: Tuple[str, ...] = tuple(
+            bytes(buffer[start:start + PACKAGE_CODE_SIZE])
+            .rstrip(b'\0').decode('ascii')
+            for start in range(offset,
+                               offset + code_count * PACKAGE_CODE_SIZE,
+                               PACKAGE_CODE_SIZE)
+        )
+        offset = _align(offset + code_count * PACKAGE_CODE_SIZE)
+        self.type_index: memoryview = self._view(buffer[offset:offset + size])
+        offset = _align(offset + size)
+        if len(buffer) != offset + size * 8 * len(PACKAGE_FIELDS):
+            raise ValueError('Файл пакетов повреждён')
+        self.columns: Dict[str, Sequence[float]] = {}
+        for name, type_code in PACKAGE_FIELDS.items():
+            column = self._view(buffer[offset:offset + size * 8])
+            if sys.byteorder == 'little':
+                self.columns[name] = self._view(column.cast(type_code))
+            else:
+                self.columns[name] = array(type_code, bytes(column))
+                self.columns[name].byteswap()
+            offset += size * 8
+
+    def _view(self, view: memoryview) -> memoryview:
+        self._views.append(view)
+        return view
+
+    def __len__(self) -> int:
+        return len(self.type_index)
+
+    def __enter__(self) -> 'PackageFile':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @property
+    def workout_types(self) -> TypeCodeColumn:
+        """Коды тренировок по строкам файла."""
+        return TypeCodeColumn(self.codes, self.type_index)
+
+    def calculate(self) -> BatchResult:
+        """Рассчитать показатели для всех пакетов файла."""
+        return calculate_batch(self.workout_types, **self.columns)
+
+    def calculate_chunks(self,
+                         chunk_size: int = 10000,
+                         start: int = 0
+                         ) -> Iterator[Tuple[int, BatchResult]]:
+        """Рассчитать пакеты файла кусками, начиная со строки start."""
+        for offset in range(start, len(self), chunk_size):
+            end: int = min(offset + chunk_size, len(self))
+            type_index: memoryview = self.type_index[offset:end]
+            columns: Dict[str, Sequence[float]] = {
+                name: column[offset:end]
+                for name, column in self.columns.items()
+            }
+            try:
+                result = calculate_batch(
+                    TypeCodeColumn(self.codes, type_index), **columns
+                )
+            finally:
+                type_index.release()
+                for column in columns.values():
+                    if isinstance(column, memoryview):
+                        column.release()
+            yield offset, result
+
+    def close(self) -> None:
+        """Освободить представления столбцов и закрыть файл."""
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._mmap.close()
+
+
+_CLOSED = object()
+
+
+class AsyncBatcher:
+    """Сборщик пакетов из асинхронных источников в микропакеты.
+
+    Пакет уходит в расчёт, когда набрано max_batch записей или
+    прошло max_delay секунд с первой записи. Ограниченные очереди
+    притормаживают источники, если потребители не успевают.
+    Недопустимые пакеты не прерывают поток: они передаются в
+    on_reject(workout_type, data, reason), а без него копятся в rejected.
+    """
+
+    def __init__(self,
+                 max_batch: int = 1024,
+                 max_delay: float = 0.005,
+                 queue_size: int = 10000,
+                 results_size: int = 16,
+                 on_reject: Optional[Callable[[str, Any, str], None]] = None
+                 ) -> None:
+        self.max_batch: int = max_batch
+        self.max_delay: float = max_delay
+        self.queue_size: int = queue_size
+        self.results_size: int = results_size
+        self.rejected: List[Tuple[str, Any, str]] = []
+        self.on_reject: Callable[[str, Any, str], None] = (
+            on_reject or self._store_rejected
+        )
+        self._input: Optional[asyncio.Queue] = None
+        self._output: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> 'AsyncBatcher':
+        import asyncio
+
+        self._input = asyncio.Queue(self.queue_size)
+        self._output = asyncio.Queue(self.results_size)
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        import asyncio
+
+        if not self._task.done():
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def submit(self, workout_type: str, data: Sequence[float]) -> None:
+        """Поставить пакет в очередь, дождавшись свободного места."""
+        await self._input.put((workout_type, data))
+
+    async def consume(self,
+                      source: AsyncIterable[Tuple[str, Sequence[float]]]
+                      ) -> None:
+        """Передать в очередь все пакеты асинхронного источника."""
+        async for workout_type, data in source:
+            await self._input.put((workout_type, data))
+
+    async def close(self) -> None:
+        """Завершить приём пакетов и рассчитать оставшиеся."""
+        await self._input.put(_CLOSED)
+
+    def __aiter__(self) -> AsyncIterator[BatchResult]:
+        return self._results()
+
+    async def _results(self) -> AsyncIterator[BatchResult]:
+        while True:
+            result = await self._output.get()
+            if result is _CLOSED:
+                return
+            if isinstance(result, Exception):
+                raise result
+            yield result
+
+    async def _collect(self, batch: List[Any]) -> bool:
+        """Добрать микропакет; вернуть True, если приём закрыт."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        deadline: float = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            if self._input.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    return False
+                try:
+                    item = await asyncio.wait_for(self._input.get(), timeout)
+                except asyncio.TimeoutError:
+                    return False
+            else:
+                item = self._input.get_nowait()
+            if item is _CLOSED:
+                return True
+            batch.append(item)
+        return False
+
+    def _store_rejected(self, workout_type: str, data: Any, reason: str
+                        ) -> None:
+        self.rejected.append((workout_type, data, reason))
+
+    def _calculate(self, batch: List[Any]) -> BatchResult:
+        """Рассчитать допустимые пакеты, отклонив остальные."""
+        report: ValidationReport = validate_packages(batch)
+        for row, reason in report.rejected:
+            self.on_reject(*batch[row], reason)
+        batch = report.select(batch)
+        try:
+            return read_package_batch(batch)
+        except Exception:
+            valid: List[Any] = []
+            for workout_type, data in batch:
+                try:
+                    read_package(workout_type, data).show_training_info()
+                except Exception as error:
+                    self.on_reject(workout_type, data, str(error))
+                else:
+                    valid.append((workout_type, data))
+            return read_package_batch(valid)
+
+    async def _run(self) -> None:
+        closed: bool = False
+        while not closed:
+            item = await self._input.get()
+            if item is _CLOSED:
+                break
+            batch: List[Any] = [item]
+            closed = await self._collect(batch)
+            try:
+                result: Any = self._calculate(batch)
+            except Exception as error:
+                result = error
+            if not isinstance(result, BatchResult) or len(result):
+                await self._output.put(result)
+        await self._output.put(_CLOSED)
+
+
+async def iter_packages_async(packages: Iterable[Tuple[str, Sequence[float]]],
+                              delay: float = 0.0
+                              ) -> AsyncIterator[Tuple[str, Sequence[float]]]:
+    """Асинхронный источник пакетов из обычной коллекции."""
+    import asyncio
+
+    for package in packages:
+        await asyncio.sleep(delay)
+        yield package
+
+
+async def iter_stream_results(
+    sources: Iterable[AsyncIterable[Tuple[str, Sequence[float]]]],
+    **options: Any
+) -> AsyncIterator[BatchResult]:
+    """Рассчитать пакеты из нескольких источников микропакетами.
+
+    Ошибка источника передаётся потребителю после уже принятых пакетов.
+    """
+    import asyncio
+
+    async with AsyncBatcher(**options) as batcher:
+        async def feed() -> None:
+            try:
+                await asyncio.gather(*(batcher.consume(source)
+                                       for source in sources))
+            finally:
+                await batcher.close()
+
+        feeder = asyncio.ensure_future(feed())
+        try:
+            async for result in batcher:
+                yield result
+            await feeder
+        finally:
+            feeder.cancel()
+
+
+def render_messages(result: BatchResult,
+                    message_class: Type[InfoMessage] = InfoMessage
+                    ) -> List[str]:
+    """Сформировать строки сообщений для результатов пакета."""
+    template: str = message_class._TEMPLATE
+    if message_class._FORMAT_FALLBACK:
+        output: str = message_class.OUTPUT
+        return [output.format(**dict(zip(RESULT_FIELDS, row)))
+                for row in zip(*(getattr(result, name)
+                                 for name in RESULT_FIELDS))]
+    if not message_class._FIELD_NAMES:
+        return [template % ()] * len(result)
+    columns = [getattr(result, name) for name in message_class._FIELD_NAMES]
+    return [template % row for row in zip(*columns)]
+
+
+def write_messages(result: BatchResult,
+                   stream: TextIO,
+                   message_class: Type[InfoMessage] = InfoMessage
+                   ) -> None:
+    """Записать сообщения пакета в поток одной операцией записи."""
+    lines: List[str] = render_messages(result, message_class)
+    if lines:
+        lines.append('')
+        stream.write('\n'.join(lines))
+
+
+EXPORT_BUFFER_SIZE: int = 1 << 20
+RESULT_MAGIC: bytes = b'HWRS'
+RESULT_VERSION: int = 2
+RESULT_HEADER: struct.Struct = struct.Struct('<4sHH')
+RESULT_COMPRESSED: int = 1
+RESULT_SIZE: struct.Struct = struct.Struct('<Q')
+RESULT_MAX_NAMES: int = 1 << 16
+RESULT_COLUMNS: Tuple[str, ...] = RESULT_FIELDS[1:]
+
+
+def export_csv(results: Iterable[BatchResult],
+               path: str,
+               compress: bool = False,
+               append: bool = False
+               ) -> None:
+    """Выгрузить результаты пакетов в CSV, при желании со сжатием gzip."""
+    mode: str = 'at' if append else 'wt'
+    if compress:
+        import gzip
+
+        file = gzip.open(path, mode, encoding='utf-8', newline='')
+    else:
+        file = open(path, mode, encoding='utf-8', newline='',
+                    buffering=EXPORT_BUFFER_SIZE)
+    with file:
+        write_csv(results, file, header=not append)
+
+
+def write_csv(results: Iterable[BatchResult],
+              stream: TextIO,
+              header: bool = True
+              ) -> None:
+    """Записать результаты пакетов в текстовый поток в формате CSV."""
+    import csv
+
+    writer = csv.writer(stream)
+    if header:
+        writer.writerow(RESULT_FIELDS)
+    for result in results:
+        writer.writerows(zip(*(getattr(result, field)
+                               for field in RESULT_FIELDS)))
+
+
+def _write_chunk(file: BinaryIO, payload: bytes, compress: bool) -> None:
+    """Записать блок данных с префиксом длины."""
+    if compress:
+        import zlib
+
+        payload = zlib.compress(payload)
+    file.write(RESULT_SIZE.pack(len(payload)))
+    file.write(payload)
+
+
+def _read_exact(file: BinaryIO, size: int) -> bytes:
+    """Прочитать ровно size байт или сообщить о повреждении файла."""
+    data: bytes = file.read(size)
+    if len(data) != size:
+        raise ValueError('Файл результатов повреждён')
+    return data
+
+
+def _read_chunk(file: BinaryIO, compress: bool) -> bytes:
+    """Прочитать блок данных с префиксом длины."""
+    (size,) = RESULT_SIZE.unpack(_read_exact(file, RESULT_SIZE.size))
+    payload: bytes = _read_exact(file, size)
+    if compress:
+        import zlib
+
+        payload = zlib.decompress(payload)
+    return payload
+
+
+def export_columnar(results: Iterable[BatchResult],
+                    path: str,
+                    compress: bool = False
+                    ) -> None:
+    """Выгрузить результаты в двоичный файл по столбцам.
+
+    Каждый пакет записывается отдельным блоком: таблица названий
+    тренировок, номера названий по строкам (uint16) и столбцы float64.
+    """
+    flags: int = RESULT_COMPRESSED if compress else 0
+    with open(path, 'wb', buffering=EXPORT_BUFFER_SIZE) as file:
+        file.write(RESULT_HEADER.pack(RESULT_MAGIC, RESULT_VERSION, flags))
+        for result in results:
+            names: Dict[str, int] = {}
+            indexes: List[int] = [names.setdefault(name, len(names))
+                                  for name in result.training_type]
+            if len(names) > RESULT_MAX_NAMES:
+                raise ValueError(
+                    'Слишком много названий тренировок в пакете: '
+                    f'{len(names)}, допустимо не больше {RESULT_MAX_NAMES}'
+                )
+            type_index = array('H', indexes)
+            if sys.byteorder != 'little':
+                type_index.byteswap()
+            file.write(RESULT_SIZE.pack(len(result)))
+            _write_chunk(file, '\n'.join(names).encode('utf-8'), compress)
+            _write_chunk(file, type_index.tobytes(), compress)
+            for field in RESULT_COLUMNS:
+                column = array('d', getattr(result, field))
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                _write_chunk(file, column.tobytes(), compress)
+
+
+def read_columnar(path: str) -> Iterator[BatchResult]:
+    """Прочитать результаты из двоичного файла по столбцам."""
+    with open(path, 'rb', buffering=EXPORT_BUFFER_SIZE) as file:
+        magic, version, flags = RESULT_HEADER.unpack(
+            _read_exact(file, RESULT_HEADER.size)
+        )
+        if magic != RESULT_MAGIC or version != RESULT_VERSION:
+            raise ValueError('Неподдерживаемый формат файла результатов')
+        compress: bool = bool(flags & RESULT_COMPRESSED)
+        while True:
+            block = file.read(RESULT_SIZE.size)
+            if not block:
+                return
+            if len(block) != RESULT_SIZE.size:
+                raise ValueError('Файл результатов повреждён')
+            (size,) = RESULT_SIZE.unpack(block)
+            names = _read_chunk(file, compress).decode('utf-8').split('\n')
+            payload = _read_chunk(file, compress)
+            if len(payload) % 2:
+                raise ValueError('Файл результатов повреждён')
+            type_index = array('H', payload)
+            if sys.byteorder != 'little':
+                type_index.byteswap()
+            columns: List[array] = []
+            for _ in RESULT_COLUMNS:
+                column = array('d', _read_chunk(file, compress))
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                columns.append(column)
+            if len(type_index) != size or any(
+                len(column) != size for column in columns
+            ) or (size and max(type_index) >= len(names)):
+                raise ValueError('Файл результатов повреждён')
+            yield BatchResult([names[index] for index in type_index],
+                              *columns)
 
 
 def read_package(workout_type: str, data: list) -> Training:
     """Прочитать данные полученные от датчиков."""
-    training_dict: Dict[str, Type[Training]] = {'SWM': Swimming,
-                                                'RUN': Running,
-                                                'WLK': SportsWalking}
-    if workout_type not in training_dict:
+    training_class = TRAINING_TYPES.get(workout_type)
+    if training_class is None:
         raise ValueError('Такой тренировки нету')
-    return training_dict[workout_type](*data)
+    if len(data) != len(TRAINING_PARAMS[workout_type]):
+        raise ValueError('Неверное количество параметров тренировки')
+    if _profiler is None:
+        return training_class(*data)
+    start: float = perf_counter()
+    training: Training = training_class(*data)
+    _profiler.record('dispatch', workout_type, perf_counter() - start)
+    return training
+
+
+class Totals(Record):
+    """Накопленные суммы показателей тренировок."""
+
+    __slots__ = ('count', 'duration', 'distance', 'speed', 'calories')
+
+    def __init__(self,
+                 count: int = 0,
+                 duration: float = 0.0,
+                 distance: float = 0.0,
+                 speed: float = 0.0,
+                 calories: float = 0.0
+                 ) -> None:
+        self.count: int = count
+        self.duration: float = duration
+        self.distance: float = distance
+        self.speed: float = speed
+        self.calories: float = calories
+
+    def add(self,
+            duration: float,
+            distance: float,
+            speed: float,
+            calories: float
+            ) -> None:
+        """Учесть одну тренировку."""
+        self.count += 1
+        self.duration += duration
+        self.distance += distance
+        self.speed += speed
+        self.calories += calories
+
+    def merge(self, other: 'Totals') -> None:
+        """Добавить суммы другого накопителя."""
+        self.count += other.count
+        self.duration += other.duration
+        self.distance += other.distance
+        self.speed += other.speed
+        self.calories += other.calories
+
+    def mean(self, field: str) -> float:
+        """Получить среднее значение показателя."""
+        if not self.count:
+            return 0.0
+        return getattr(self, field) / self.count
+
+
+class TrainingAggregator:
+    """Итоги тренировок по спортсменам в скользящем окне.
+
+    Время делится на корзины по bucket_seconds секунд, хранятся только
+    последние retention корзин.
+    """
+
+    def __init__(self,
+                 bucket_seconds: float = 86400,
+                 retention: int = 7
+                 ) -> None:
+        self.bucket_seconds: float = bucket_seconds
+        self.retention: int = retention
+        self.newest: Optional[int] = None
+        self._buckets: Dict[Any, Dict[int, Totals]] = {}
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    def _advance(self, bucket: int) -> None:
+        if self.newest is None or bucket > self.newest:
+            self.newest = bucket
+            self.expire()
+
+    def add(self, athlete: Any, timestamp: float, info: InfoMessage) -> None:
+        """Учесть сообщение о тренировке спортсмена."""
+        self.add_values(athlete, timestamp, info.duration, info.distance,
+                        info.speed, info.calories)
+
+    def add_values(self,
+                   athlete: Any,
+                   timestamp: float,
+                   duration: float,
+                   distance: float,
+                   speed: float,
+                   calories: float
+                   ) -> None:
+        """Учесть показатели тренировки спортсмена."""
+        bucket: int = self._bucket(timestamp)
+        self._advance(bucket)
+        if bucket <= self.newest - self.retention:
+            return
+        buckets = self._buckets.setdefault(athlete, {})
+        totals = buckets.get(bucket)
+        if totals is None:
+            totals = buckets[bucket] = Totals()
+        totals.add(duration, distance, speed, calories)
+
+    def add_batch(self,
+                  athletes: Sequence[Any],
+                  timestamps: Sequence[float],
+                  result: BatchResult
+                  ) -> None:
+        """Учесть результаты пакетного расчёта."""
+        for row in zip(athletes, timestamps, result.duration,
+                       result.distance, result.speed, result.calories):
+            self.add_values(*row)
+
+    def expire(self) -> None:
+        """Удалить корзины, вышедшие за пределы окна."""
+        if self.newest is None:
+            return
+        oldest: int = self.newest - self.retention
+        for athlete in list(self._buckets):
+            buckets = self._buckets[athlete]
+            for bucket in [bucket for bucket in buckets if bucket <= oldest]:
+                del buckets[bucket]
+            if not buckets:
+                del self._buckets[athlete]
+
+    def totals(self,
+               athlete: Any,
+               buckets: int = 1,
+               timestamp: Optional[float] = None
+               ) -> Totals:
+        """Получить итоги спортсмена за последние buckets корзин."""
+        last: Optional[int] = (self.newest if timestamp is None
+                               else self._bucket(timestamp))
+        result: Totals = Totals()
+        if last is None:
+            return result
+        athlete_buckets = self._buckets.get(athlete, {})
+        for bucket in range(last - buckets + 1, last + 1):
+            totals = athlete_buckets.get(bucket)
+            if totals is not None:
+                result.merge(totals)
+        return result
+
+    def merge(self, other: 'TrainingAggregator') -> None:
+        """Добавить итоги агрегатора из другого процесса."""
+        if other.bucket_seconds != self.bucket_seconds:
+            raise ValueError('Размеры корзин агрегаторов не совпадают')
+        for athlete, buckets in other._buckets.items():
+            own = self._buckets.setdefault(athlete, {})
+            for bucket, totals in buckets.items():
+                own.setdefault(bucket, Totals()).merge(totals)
+        if other.newest is not None and (self.newest is None
+                                         or other.newest > self.newest):
+            self.newest = other.newest
+        self.expire()
+
+
+CHECKPOINT_VERSION: int = 2
+
+
+def _package_source(path: str, packages: PackageFile) -> List[int]:
+    """Признаки файла пакетов, по которым опознаётся контрольная точка."""
+    import zlib
+
+    stat = os.stat(path)
+    header_size: int = (PACKAGE_HEADER.size
+                        + len(packages.codes) * PACKAGE_CODE_SIZE)
+    return [stat.st_size, stat.st_mtime_ns, len(packages),
+            zlib.crc32(packages._mmap[:header_size])]
+
+
+def _load_checkpoint(path: str, source: List[int]) -> Optional[dict]:
+    """Прочитать контрольную точку задания, если она есть."""
+    import json
+
+    try:
+        with open(path, encoding='utf-8') as file:
+            state: dict = json.load(file)
+    except FileNotFoundError:
+        return None
+    if (state.get('version') != CHECKPOINT_VERSION
+            or state.get('source') != source):
+        raise ValueError('Контрольная точка относится к другому файлу')
+    return state
+
+
+def _save_checkpoint(path: str, state: dict) -> None:
+    """Атомарно сохранить контрольную точку задания."""
+    import json
+
+    temporary: str = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def _open_output(path: str, state: Optional[dict]) -> BinaryIO:
+    """Открыть вывод задания заново или с сохранённого размера."""
+    if state is None:
+        return open(path, 'wb', buffering=EXPORT_BUFFER_SIZE)
+    file: BinaryIO = open(path, 'r+b', buffering=EXPORT_BUFFER_SIZE)
+    file.truncate(state['output_size'])
+    file.seek(state['output_size'])
+    return file
+
+
+def run_checkpointed(package_path: str,
+                     output_path: str,
+                     checkpoint_path: Optional[str] = None,
+                     chunk_size: int = 10000,
+                     checkpoint_interval: int = 10
+                     ) -> Dict[str, Totals]:
+    """Рассчитать файл пакетов в CSV с контрольными точками.
+
+    Контрольная точка сохраняется каждые checkpoint_interval кусков.
+    Повторный вызов после сбоя обрезает вывод до сохранённого размера
+    и продолжает расчёт. Возвращает итоги по типам тренировок.
+    """
+    import csv
+    import io
+
+    if chunk_size < 1 or checkpoint_interval < 1:
+        raise ValueError('Размер куска и интервал контрольных точек '
+                         'должны быть положительными')
+    if checkpoint_path is None:
+        checkpoint_path = output_path + '.checkpoint'
+    with PackageFile(package_path) as packages:
+        source: List[int] = _package_source(package_path, packages)
+        state = _load_checkpoint(checkpoint_path, source)
+        totals: Dict[str, Totals] = {}
+        start: int = 0
+        if state is not None:
+            start = state['offset']
+            totals = {name: Totals(*values)
+                      for name, values in state['totals'].items()}
+        buffer = io.StringIO(newline='')
+        writer = csv.writer(buffer)
+        if state is None:
+            writer.writerow(RESULT_FIELDS)
+        with _open_output(output_path, state) as file:
+            chunks = packages.calculate_chunks(chunk_size, start)
+            for number, (offset, result) in enumerate(chunks, 1):
+                writer.writerows(zip(*(getattr(result, field)
+                                       for field in RESULT_FIELDS)))
+                for name, *values in zip(*(getattr(result, field)
+                                           for field in RESULT_FIELDS)):
+                    totals.setdefault(name, Totals()).add(*values)
+                file.write(buffer.getvalue().encode('utf-8'))
+                buffer.seek(0)
+                buffer.truncate()
+                if number % checkpoint_interval:
+                    continue
+                file.flush()
+                os.fsync(file.fileno())
+                _save_checkpoint(checkpoint_path, {
+                    'version': CHECKPOINT_VERSION,
+                    'source': source,
+                    'offset': offset + len(result),
+                    'output_size': file.tell(),
+                    'totals': {name: [getattr(total, field)
+                                      for field in Totals._RECORD_FIELDS]
+                               for name, total in totals.items()},
+                })
+            file.write(buffer.getvalue().encode('utf-8'))
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return totals
+
+
+class TrainingCache:
+    """Потокобезопасный LRU-кэш сообщений для повторяющихся пакетов.
+
+    Возвращаемые сообщения общие для всех вызовов: их нельзя изменять.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        import threading
+
+        if maxsize < 1:
+            raise ValueError('Размер кэша должен быть положительным')
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def show_training_info(self,
+                           workout_type: str,
+                           data: Sequence[float]
+                           ) -> InfoMessage:
+        """Вернуть сообщение для пакета, рассчитав его при промахе."""
+        key: Tuple[str, Tuple[float, ...]] = (workout_type, tuple(data))
+        with self._lock:
+            info: Optional[InfoMessage] = self._data.get(key)
+            if info is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return info
+            self.misses += 1
+        info = read_package(workout_type, data).show_training_info()
+        with self._lock:
+            self._data[key] = info
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return info
+
+    def stats(self) -> Dict[str, int]:
+        """Вернуть счётчики попаданий, промахов и вытеснений."""
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'size': len(self._data),
+                    'maxsize': self.maxsize}
+
+    def clear(self) -> None:
+        """Очистить кэш и сбросить счётчики."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+class CalculatorService:
+    """Общий сервис расчёта для многопоточных вызовов.
+
+    Одиночные пакеты из разных потоков собираются в пакеты не больше
+    max_batch записей, ожидая не дольше max_delay секунд, и
+    рассчитываются пакетно в пуле потоков.
+    """
+
+    def __init__(self,
+                 max_workers: int = 4,
+                 max_batch: int = 1024,
+                 max_delay: float = 0.001
+                 ) -> None:
+        import queue
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.max_batch: int = max_batch
+        self.max_delay: float = max_delay
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix='homework-calculator'
+        )
+        self._collector = threading.Thread(target=self._collect,
+                                           name='homework-collector',
+                                           daemon=True)
+        self._closed: bool = False
+        self._lock: threading.Lock = threading.Lock()
+        self._collector.start()
+
+    def __enter__(self) -> 'CalculatorService':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def submit(self,
+               workout_type: str,
+               data: Sequence[float]
+               ) -> 'Future':
+        """Поставить пакет в очередь; Future вернёт InfoMessage."""
+        from concurrent.futures import Future
+
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Сервис расчёта остановлен')
+            self._queue.put((workout_type, data, future))
+        return future
+
+    def submit_batch(self,
+                     packages: Sequence[Tuple[str, Sequence[float]]]
+                     ) -> 'Future':
+        """Рассчитать список пакетов в пуле; Future вернёт BatchResult."""
+        if self._closed:
+            raise RuntimeError('Сервис расчёта остановлен')
+        return self._executor.submit(read_package_batch, packages)
+
+    def close(self) -> None:
+        """Рассчитать принятые пакеты и остановить потоки сервиса."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_CLOSED)
+        self._collector.join()
+        self._executor.shutdown()
+
+    def _collect(self) -> None:
+        """Собирать одиночные пакеты в пакеты для пула потоков."""
+        import queue
+
+        closed: bool = False
+        while not closed:
+            item = self._queue.get()
+            if item is _CLOSED:
+                break
+            batch: List[Any] = [item]
+            deadline: float = perf_counter() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout: float = deadline - perf_counter()
+                try:
+                    if timeout > 0:
+                        item = self._queue.get(timeout=timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _CLOSED:
+                    closed = True
+                    break
+                batch.append(item)
+            self._executor.submit(self._calculate, batch)
+
+    @staticmethod
+    def _calculate(batch: List[Any]) -> None:
+        """Рассчитать пакет и передать результаты ожидающим Future."""
+        batch = [item for item in batch
+                 if item[2].set_running_or_notify_cancel()]
+        try:
+            result = read_package_batch([(workout_type, data)
+                                         for workout_type, data, _ in batch])
+        except Exception:
+            for workout_type, data, future in batch:
+                try:
+                    info = read_package(workout_type,
+                                        data).show_training_info()
+                except Exception as error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(info)
+            return
+        for row, (_, _, future) in enumerate(batch):
+            future.set_result(result.get_info(row))
 
 
 def main(training: Training) -> None:
@@ -145,13 +2142,115 @@ def main(training: Training) -> None:
     print(info.get_message())
 
 
+def _parse_number(token: str) -> float:
+    """Разобрать целое или дробное число."""
+    if token.lstrip('+-').isdigit():
+        return int(token)
+    return float(token)
+
+
+def parse_package_line(line: str) -> Tuple[str, List[float]]:
+    """Разобрать строку пакета вида «SWM 720 1 80 25 40»."""
+    workout_type, *values = line.replace(',', ' ').split()
+    return workout_type, [_parse_number(value) for value in values]
+
+
+def iter_package_lines(lines: Iterable[str]
+                       ) -> Iterator[Tuple[str, List[float]]]:
+    """Прочитать пакеты из текстовых строк, пропуская пустые и «#»."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            package = parse_package_line(line)
+        except ValueError:
+            raise ValueError(
+                f'строка {number}: не удалось разобрать пакет «{line}»'
+            ) from None
+        yield package
+
+
+def _check_report(report: ValidationReport, offset: int = 0) -> None:
+    """Прервать расчёт, если в пакете есть недопустимые строки."""
+    if report.rejected:
+        row, reason = report.rejected[0]
+        raise ValueError(f'пакет {offset + row + 1}: {reason}')
+
+
+def _calculate_cli_chunks(chunks: Iterable[List[Tuple[str, List[float]]]]
+                          ) -> Iterator[BatchResult]:
+    """Проверить и рассчитать куски пакетов из текстового ввода."""
+    offset: int = 0
+    for chunk in chunks:
+        _check_report(validate_packages(chunk), offset)
+        yield read_package_batch(chunk)
+        offset += len(chunk)
+
+
+def _iter_cli_results(args: Any) -> Iterator[BatchResult]:
+    """Рассчитать пакеты из источника, указанного в командной строке."""
+    if args.binary:
+        with PackageFile(args.input) as package_file:
+            _check_report(validate_batch(package_file.workout_types,
+                                         **package_file.columns))
+            yield package_file.calculate()
+        return
+    if args.input == '-':
+        chunks = iter_chunks(iter_package_lines(sys.stdin), args.chunk_size)
+        yield from _calculate_cli_chunks(chunks)
+        return
+    with open(args.input, encoding='utf-8') as file:
+        chunks = iter_chunks(iter_package_lines(file), args.chunk_size)
+        yield from _calculate_cli_chunks(chunks)
+
+
+def _positive_int(value: str) -> int:
+    """Разобрать положительное целое для аргумента командной строки."""
+    import argparse
+
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(
+            f'ожидается положительное целое число: {value}'
+        )
+    return number
+
+
+def run_cli(argv: Optional[Sequence[str]] = None) -> int:
+    """Точка входа командной строки."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='homework',
+        description='Расчёт показателей тренировок по пакетам датчиков.'
+    )
+    parser.add_argument('input', nargs='?', default='-',
+                        help='файл с пакетами, по умолчанию stdin')
+    parser.add_argument('--binary', action='store_true',
+                        help='файл в двоичном формате пакетов')
+    parser.add_argument('--format', choices=('text', 'csv'), default='text',
+                        help='формат вывода')
+    parser.add_argument('--chunk-size', type=_positive_int, default=10000,
+                        help='число пакетов в одном расчёте')
+    args = parser.parse_args(argv)
+    if args.binary and args.input == '-':
+        parser.error('двоичный формат читается только из файла')
+    try:
+        results = _iter_cli_results(args)
+        if args.format == 'csv':
+            write_csv(results, sys.stdout)
+        else:
+            for result in results:
+                write_messages(result, sys.stdout)
+    except (OSError, ValueError, ArithmeticError) as error:
+        print(f'{parser.prog}: {error}', file=sys.stderr)
+        return 1
+    return 0
+
+
 if __name__ == '__main__':
-    packages = [
-        ('SWM', [720, 1, 80, 25, 40]),
-        ('RUN', [1206, 12, 6]),
-        ('WLK', [9000, 1, 75, 180]),
-    ]
-
-    for workout_type, data in packages:
-        training = read_package(workout_type, data)
-        main(training)
+    sys.exit(run_cli())
@@ -0,0 +1,318 @@
+"""Разностные тесты всех способов расчёта против классов тренировок.
+
+Размер и зёрна наборов: HW_EQUIVALENCE_SIZE, HW_EQUIVALENCE_SEEDS.
+Проверка скорости включается HW_BENCH_CHECK=1 и сравнивает замеры с
+базовой линией (HW_BENCH_BASELINE, по умолчанию benchmarks/baseline.json).
+Базовая линия зависит от машины и обновляется командой
+
+    python benchmarks/bench_homework.py --save-baseline
+"""
+import asyncio
+import csv
+import gzip
+import json
+import os
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+import homework
+
+SIZE = int(os.environ.get('HW_EQUIVALENCE_SIZE', 5000))
+SEEDS = [int(seed) for seed
+         in os.environ.get('HW_EQUIVALENCE_SEEDS', '0 1 2').split()]
+BENCHMARKS_DIR = Path(__file__).resolve().parent.parent / 'benchmarks'
+BASELINE_PATH = Path(os.environ.get('HW_BENCH_BASELINE',
+                                    BENCHMARKS_DIR / 'baseline.json'))
+
+
+def random_walking(rnd):
+    """Ходьба, у которой скорость ** 2 // рост на границе целого."""
+    action = rnd.choice([rnd.randint(0, 40000),
+                         float(rnd.randint(0, 40000)),
+                         rnd.uniform(0.0, 40000.0)])
+    duration = rnd.choice([rnd.uniform(0.1, 3.0), rnd.randint(1, 3)])
+    weight = rnd.uniform(40.0, 130.0)
+    speed = (action * homework.Training.LEN_STEP
+             / homework.Training.M_IN_KM / duration)
+    if speed and rnd.random() < 0.5:
+        height = speed ** 2 / rnd.randint(1, 5)
+        height *= rnd.choice([1.0, 1 - 2 ** -52, 1 + 2 ** -52])
+    else:
+        height = rnd.choice([rnd.uniform(140.0, 210.0),
+                             rnd.randint(1, 10), rnd.uniform(0.01, 1.0)])
+    return [action, duration, weight, height]
+
+
+def random_package(rnd):
+    """Случайный пакет, включая граничные значения параметров."""
+    workout_type = rnd.choice(['RUN', 'WLK', 'SWM'])
+    if workout_type == 'WLK':
+        return workout_type, random_walking(rnd)
+    action = rnd.choice([0, 1, rnd.randint(1, 50000), 10 ** 9,
+                         float(rnd.randint(1, 50000)),
+                         rnd.uniform(0.0, 50000.0)])
+    duration = rnd.choice([rnd.uniform(0.01, 5.0), rnd.randint(1, 12),
+                           1e-6])
+    weight = rnd.choice([rnd.uniform(40.0, 130.0), rnd.randint(1, 200)])
+    if workout_type == 'RUN':
+        return workout_type, [action, duration, weight]
+    return workout_type, [action, duration, weight,
+                          rnd.choice([25, 50, rnd.uniform(1.0, 100.0)]),
+                          rnd.choice([rnd.randint(0, 200),
+                                      float(rnd.randint(0, 200)),
+                                      rnd.uniform(0.0, 200.0)])]
+
+
+def generate_packages(size, seed):
+    rnd = random.Random(seed)
+    return [random_package(rnd) for _ in range(size)]
+
+
+def reference(packages):
+    """Результаты эталонного расчёта через классы тренировок."""
+    rows = []
+    for workout_type, data in packages:
+        info = homework.read_package(workout_type, data).show_training_info()
+        rows.append((info.training_type, info.duration, info.distance,
+                     info.speed, info.calories))
+    return rows
+
+
+def result_rows(results):
+    return [row for result in results
+            for row in zip(*(getattr(result, field)
+                             for field in homework.RESULT_FIELDS))]
+
+
+def package_columns(packages):
+    columns = {name: [] for name in homework.PACKAGE_FIELDS}
+    for workout_type, data in packages:
+        params = homework.TRAINING_PARAMS[workout_type]
+        values = dict(zip(params, data))
+        for name, column in columns.items():
+            column.append(values.get(name, 0))
+    return [workout_type for workout_type, _ in packages], columns
+
+
+def assert_rows_equal(actual, expected, engine):
+    assert len(actual) == len(expected), (
+        f'Движок {engine} вернул не все строки.'
+    )
+    for index, (row, expected_row) in enumerate(zip(actual, expected)):
+        assert tuple(row) == expected_row, (
+            f'Движок {engine} расходится с классами в строке {index}: '
+            f'{row} != {expected_row}'
+        )
+
+
+@pytest.fixture(scope='module', params=SEEDS, ids=lambda seed: f'seed{seed}')
+def packages(request):
+    return generate_packages(SIZE, request.param)
+
+
+@pytest.fixture(scope='module')
+def expected(packages):
+    return reference(packages)
+
+
+def test_walking_floor_corner_cases():
+    rnd = random.Random(0)
+    corner = 0
+    for _ in range(1000):
+        data = random_walking(rnd)
+        training = homework.SportsWalking(*data)
+        ratio = training.get_mean_speed() ** 2 / training.height
+        corner += ratio == int(ratio)
+    assert corner, 'Генератор должен давать пакеты на границе `//`.'
+
+
+def test_read_package_batch(packages, expected):
+    result = homework.read_package_batch(packages)
+    assert_rows_equal(result_rows([result]), expected, 'read_package_batch')
+
+
+def test_calculate_batch(packages, expected):
+    workout_types, columns = package_columns(packages)
+    result = homework.calculate_batch(workout_types, **columns)
+    assert_rows_equal(result_rows([result]), expected, 'calculate_batch')
+
+
+def test_training_array(packages, expected):
+    for code, training_class in homework.TRAINING_TYPES.items():
+        rows = [data for workout_type, data in packages
+                if workout_type == code]
+        trainings = homework.TrainingArray(training_class, rows)
+        assert_rows_equal(
+            result_rows([trainings.show_training_info()]),
+            [row for (workout_type, _), row in zip(packages, expected)
+             if workout_type == code],
+            f'TrainingArray[{code}]'
+        )
+
+
+def test_iter_package_results(packages, expected):
+    actual = list(homework.iter_package_results(packages, chunk_size=333))
+    assert_rows_equal(actual, expected, 'iter_package_results')
+
+
+def test_render_messages(packages):
+    result = homework.read_package_batch(packages)
+    assert homework.render_messages(result) == [
+        homework.read_package(*package).show_training_info().get_message()
+        for package in packages
+    ], 'Пакетный вывод сообщений должен совпадать с get_message().'
+
+
+def test_package_file(packages, expected, tmp_path):
+    path = str(tmp_path / 'packages.bin')
+    homework.write_package_file(path, packages)
+    with homework.PackageFile(path) as package_file:
+        assert_rows_equal(result_rows([package_file.calculate()]), expected,
+                          'PackageFile')
+        chunks = [result for _, result
+                  in package_file.calculate_chunks(chunk_size=777)]
+        assert_rows_equal(result_rows(chunks), expected,
+                          'PackageFile.calculate_chunks')
+
+
+def test_training_cache(packages, expected):
+    cache = homework.TrainingCache(maxsize=64)
+    repeated = packages[:200] * 3
+    actual = [cache.show_training_info(*package) for package in repeated]
+    assert_rows_equal(
+        [(info.training_type, info.duration, info.distance, info.speed,
+          info.calories) for info in actual],
+        expected[:200] * 3, 'TrainingCache'
+    )
+
+
+def test_calculator_service(packages, expected):
+    with homework.CalculatorService(max_workers=2, max_batch=64,
+                                    max_delay=0.001) as service:
+        futures = [service.submit(*package) for package in packages[:500]]
+        actual = [future.result(timeout=10) for future in futures]
+    assert_rows_equal(
+        [(info.training_type, info.duration, info.distance, info.speed,
+          info.calories) for info in actual],
+        expected[:500], 'CalculatorService'
+    )
+
+
+def test_iter_stream_results(packages, expected):
+    async def collect():
+        source = homework.iter_packages_async(packages[:1000])
+        return [result async for result in homework.iter_stream_results(
+            [source], max_batch=128, max_delay=0.01
+        )]
+
+    assert_rows_equal(result_rows(asyncio.run(collect())), expected[:1000],
+                      'iter_stream_results')
+
+
+def test_process_packages_parallel(packages, expected):
+    results = sorted(homework.process_packages_parallel(
+        packages, max_workers=2, chunk_size=1500, ordered=False
+    ), key=lambda item: item[0])
+    assert_rows_equal(result_rows(result for _, result in results),
+                      expected, 'process_packages_parallel')
+
+
+def test_process_packages_shared(packages, expected):
+    with homework.process_packages_shared(packages, max_workers=2,
+                                          chunk_size=1500) as shared:
+        actual = list(zip(shared.distance, shared.speed, shared.calories))
+    assert actual == [row[2:] for row in expected], (
+        'Результаты в разделяемой памяти должны совпадать с классами.'
+    )
+
+
+def test_athlete_profile(packages, expected):
+    rnd = random.Random(SIZE)
+    for weight, height in ((75, 180), (rnd.uniform(40.0, 130.0),
+                                       rnd.uniform(1.0, 210.0))):
+        profile = homework.AthleteProfile(weight, height)
+        athlete_packages = []
+        for workout_type, data in packages[:1000]:
+            data = list(data)
+            data[2] = weight
+            if workout_type == 'WLK':
+                data[3] = height
+            athlete_packages.append((workout_type, data))
+        workout_types, columns = package_columns(athlete_packages)
+        del columns['weight'], columns['height']
+        result = profile.calculate(workout_types, **columns)
+        for row, expected_row, workout_type in zip(
+            result_rows([result]), reference(athlete_packages),
+            workout_types
+        ):
+            assert row[:4] == expected_row[:4]
+            if workout_type == 'RUN':
+                assert row[4] == pytest.approx(
+                    expected_row[4], rel=homework.PROFILE_TOLERANCE,
+                    abs=1e-9
+                )
+            else:
+                assert row[4] == expected_row[4], (
+                    'Профиль спортсмена расходится с классами.'
+                )
+
+
+def test_exporters(packages, expected, tmp_path):
+    results = [homework.read_package_batch(chunk)
+               for chunk in homework.iter_chunks(packages, 999)]
+    columnar_path = str(tmp_path / 'results.bin')
+    homework.export_columnar(results, columnar_path, compress=True)
+    assert_rows_equal(result_rows(homework.read_columnar(columnar_path)),
+                      expected, 'export_columnar')
+    csv_path = str(tmp_path / 'results.csv.gz')
+    homework.export_csv(results, csv_path, compress=True)
+    with gzip.open(csv_path, 'rt', encoding='utf-8', newline='') as file:
+        rows = list(csv.reader(file))[1:]
+    assert_rows_equal(
+        [(name, *map(float, values)) for name, *values in rows],
+        expected, 'export_csv'
+    )
+
+
+def test_run_checkpointed(packages, expected, tmp_path):
+    package_path = str(tmp_path / 'packages.bin')
+    output_path = str(tmp_path / 'output.csv')
+    homework.write_package_file(package_path, packages)
+    homework.run_checkpointed(package_path, output_path, chunk_size=500,
+                              checkpoint_interval=3)
+    with open(output_path, encoding='utf-8', newline='') as file:
+        rows = list(csv.reader(file))[1:]
+    assert_rows_equal(
+        [(name, *map(float, values)) for name, *values in rows],
+        expected, 'run_checkpointed'
+    )
+
+
+@pytest.mark.skipif(not os.environ.get('HW_BENCH_CHECK'),
+                    reason='проверка скорости включается HW_BENCH_CHECK=1')
+def test_throughput_regression():
+    assert BASELINE_PATH.exists(), (
+        f'Нет базовой линии {BASELINE_PATH}. Сохраните её на этой машине: '
+        'python benchmarks/bench_homework.py --save-baseline'
+    )
+    sys.path.insert(0, str(BENCHMARKS_DIR))
+    try:
+        import bench_homework
+    finally:
+        sys.path.remove(str(BENCHMARKS_DIR))
+    baseline = json.loads(BASELINE_PATH.read_text())['results']
+    tolerance = float(os.environ.get('HW_BENCH_TOLERANCE', 0.2))
+    results = {}
+    for key in baseline:
+        name, size = key[:-1].rsplit('[', 1)
+        if name in bench_homework.CASES:
+            results[key] = bench_homework.measure(
+                bench_homework.CASES[name], int(size), repeat=3, memory=False
+            )
+    regressions = bench_homework.compare(results, baseline, tolerance)
+    assert not regressions, (
+        'Пропускная способность упала: ' + '; '.join(regressions)
+    )
@@ -1,7 +1,17 @@
+import asyncio
+import csv
+import gzip
+import io
+import os
 import re
+import subprocess
+import sys
+import tracemalloc
 import pytest
 import types
 import inspect
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from conftest import Capturing
 
 try:
@@ -363,3 +373,897 @@ def test_main_output(input_data, expected):
     assert get_message_output == expected, (
         'Метод `main` должен печатать результат в консоль.\n'
     )
+
+
+PACKAGES = [
+    ('SWM', [720, 1, 80, 25, 40]),
+    ('RUN', [15000, 1, 75]),
+    ('WLK', [9000, 1, 75, 180]),
+    ('RUN', [1206, 12, 6]),
+    ('WLK', [420, 4, 20, 42]),
+    ('SWM', [420, 4, 20, 42, 4]),
+]
+
+
+def package_columns(packages):
+    columns = {'action': [], 'duration': [], 'weight': [], 'height': [],
+               'length_pool': [], 'count_pool': []}
+    for workout_type, data in packages:
+        training = homework.read_package(workout_type, data)
+        for name in columns:
+            columns[name].append(getattr(training, name, 0))
+    return [workout_type for workout_type, _ in packages], columns
+
+
+def test_calculate_batch():
+    workout_types, columns = package_columns(PACKAGES)
+    result = homework.calculate_batch(workout_types, **columns)
+    assert len(result) == len(PACKAGES)
+    for index, (workout_type, data) in enumerate(PACKAGES):
+        expected = homework.read_package(workout_type, data)
+        info = result.get_info(index)
+        assert info.training_type == expected.__class__.__name__
+        assert info.distance == expected.get_distance()
+        assert info.speed == expected.get_mean_speed()
+        assert info.calories == expected.get_spent_calories(), (
+            'Пакетный расчёт должен совпадать с расчётом объектов.'
+        )
+        assert info.get_message() == (
+            expected.show_training_info().get_message()
+        )
+
+
+def test_calculate_batch_unknown_type():
+    with pytest.raises(ValueError):
+        homework.calculate_batch(['BIKE'], [1], [1], [1])
+
+
+def test_read_package_batch():
+    result = homework.read_package_batch(PACKAGES)
+    for index, (workout_type, data) in enumerate(PACKAGES):
+        expected = homework.read_package(workout_type, data)
+        assert result.get_info(index) == expected.show_training_info()
+
+
+def test_read_package_batch_wrong_length():
+    with pytest.raises(ValueError):
+        homework.read_package_batch([('RUN', [1206, 12])])
+
+
+def test_iter_package_results():
+    stream = iter(PACKAGES * 3)
+    results = homework.iter_package_results(stream, ('calories',),
+                                            chunk_size=4)
+    assert next(results) == (
+        homework.read_package(*PACKAGES[0]).get_spent_calories(),
+    )
+    expected = [
+        (homework.read_package(*package).get_spent_calories(),)
+        for package in PACKAGES * 3
+    ]
+    assert [expected[0]] + list(results) == expected
+
+
+@pytest.mark.parametrize('chunk_size', [0, -1])
+def test_iter_chunks_invalid_size(chunk_size, capsys):
+    with pytest.raises(ValueError):
+        homework.iter_chunks(PACKAGES, chunk_size)
+    with pytest.raises(ValueError):
+        list(homework.iter_package_results(PACKAGES, chunk_size=chunk_size))
+    with pytest.raises(SystemExit) as error:
+        homework.run_cli(['--chunk-size', str(chunk_size)])
+    assert error.value.code == 2
+    assert 'положительное целое' in capsys.readouterr().err
+
+
+def allocated_size(factory, count=1000):
+    tracemalloc.start()
+    try:
+        objects = [factory() for _ in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del objects
+    return size / count
+
+
+@pytest.mark.parametrize('workout_type, data', PACKAGES[:3])
+def test_slots(workout_type, data):
+    training = homework.read_package(workout_type, data)
+    info = training.show_training_info()
+    assert not hasattr(info, '__dict__'), (
+        'Класс `InfoMessage` должен хранить поля в `__slots__`.'
+    )
+    assert not hasattr(training, '__dict__'), (
+        'Параметры тренировки должны храниться в `__slots__`.'
+    )
+    params = homework.TRAINING_PARAMS[workout_type]
+
+    class DictTraining:
+        def __init__(self, *values):
+            for name, value in zip(params, values):
+                setattr(self, name, value)
+
+    assert allocated_size(lambda: homework.read_package(
+        workout_type, data
+    )) < allocated_size(lambda: DictTraining(*data)), (
+        'Тренировка со слотами должна занимать меньше памяти, '
+        'чем объект с `__dict__`.'
+    )
+
+
+def test_instance_override(monkeypatch):
+    training = homework.Training(720, 1, 80)
+    monkeypatch.setattr(training, 'get_spent_calories', lambda: 100)
+    assert training.show_training_info().calories == 100
+    monkeypatch.undo()
+    with pytest.raises(NotImplementedError):
+        training.get_spent_calories()
+    assert not homework.Training.__dict__['get_spent_calories'].overrides, (
+        'Возврат исходного метода должен удалять подмену.'
+    )
+
+
+def test_record_subclass_fields():
+    class TaggedMessage(homework.InfoMessage):
+        __slots__ = ('tag',)
+
+        def __init__(self, *args, tag=''):
+            super().__init__(*args)
+            self.tag = tag
+
+    first = TaggedMessage('Running', 1, 2.0, 2.0, 3.0, tag='a')
+    second = TaggedMessage('Swimming', 1, 2.0, 2.0, 3.0, tag='a')
+    assert first != second, (
+        'Сравнение должно учитывать поля всех родительских классов.'
+    )
+    assert repr(first).startswith("TaggedMessage(training_type='Running'")
+    assert repr(first).endswith(", tag='a')")
+
+
+@pytest.mark.parametrize('code', ['SWM', 'RUN', 'WLK'])
+def test_training_array(code):
+    rows = [data for workout_type, data in PACKAGES if workout_type == code]
+    trainings = homework.TrainingArray(homework.TRAINING_TYPES[code], rows)
+    assert len(trainings) == len(rows)
+    expected = [homework.read_package(code, data) for data in rows]
+    assert list(trainings.get_distance()) == [
+        training.get_distance() for training in expected
+    ]
+    assert list(trainings.get_mean_speed()) == [
+        training.get_mean_speed() for training in expected
+    ]
+    assert list(trainings.get_spent_calories()) == [
+        training.get_spent_calories() for training in expected
+    ]
+    result = trainings.show_training_info()
+    for index, training in enumerate(expected):
+        assert trainings.get_spent_calories(index) == (
+            training.get_spent_calories()
+        )
+        assert result.get_info(index).get_message() == (
+            trainings.show_training_info(index).get_message()
+        )
+
+
+@pytest.mark.parametrize('template, expected', [
+    ('{a} и {b:.3f}%', ('%s и %.3f%%', ('a', 'b'))),
+    ('без полей', ('без полей', ())),
+])
+def test_compile_template(template, expected):
+    assert homework.compile_template(template) == expected
+
+
+def test_info_message_without_fields():
+    class Heartbeat(homework.InfoMessage):
+        OUTPUT = 'Тренировка записана: 100%.'
+
+    message = Heartbeat('Running', 1, 2.0, 2.0, 3.0)
+    assert message.get_message() == 'Тренировка записана: 100%.'
+    result = homework.read_package_batch(PACKAGES[:2])
+    assert homework.render_messages(result, Heartbeat) == [
+        'Тренировка записана: 100%.'
+    ] * 2
+
+
+@pytest.mark.parametrize('template', [
+    '{a!r}', '{a:>10.3f}', '{a:,.1f}', '{a:-8.3f}', '{a:d}', '{a:s}',
+    '{}', '{0}', '{a.b}',
+])
+def test_compile_template_unsupported(template):
+    with pytest.raises(ValueError):
+        homework.compile_template(template)
+
+
+@pytest.mark.parametrize('output', [
+    'Ккал: {calories:>10.3f}', 'Ккал: {calories:,.1f}',
+])
+def test_info_message_format_fallback(output):
+    class AlignedMessage(homework.InfoMessage):
+        OUTPUT = output
+
+    result = homework.read_package_batch(PACKAGES)
+    expected = [output.format(calories=calories)
+                for calories in result.calories]
+    assert homework.render_messages(result, AlignedMessage) == expected
+    messages = [
+        AlignedMessage(*(getattr(info, field)
+                         for field in homework.RESULT_FIELDS)).get_message()
+        for info in map(result.get_info, range(len(result)))
+    ]
+    assert messages == expected, (
+        'Шаблон вне синтаксиса % должен выводиться через str.format.'
+    )
+
+    class IntegerMessage(homework.InfoMessage):
+        OUTPUT = '{duration:d}'
+
+    with pytest.raises(ValueError):
+        IntegerMessage('Running', 1.5, 1.0, 1.0, 1.0).get_message()
+
+
+def test_write_messages():
+    result = homework.read_package_batch(PACKAGES)
+    with Capturing() as expected:
+        for package in PACKAGES:
+            homework.main(homework.read_package(*package))
+    stream = io.StringIO()
+    homework.write_messages(result, stream)
+    assert stream.getvalue() == '\n'.join(expected) + '\n', (
+        'Пакетный вывод должен совпадать с выводом `main`.'
+    )
+    assert homework.render_messages(result) == expected
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_process_packages_parallel(ordered):
+    packages = PACKAGES * 5
+    chunks = list(homework.process_packages_parallel(
+        iter(packages), max_workers=2, chunk_size=4, ordered=ordered
+    ))
+    offsets = [offset for offset, _ in chunks]
+    if ordered:
+        assert offsets == list(range(0, len(packages), 4))
+    expected = homework.read_package_batch(packages)
+    for offset, result in chunks:
+        for index in range(len(result)):
+            assert result.get_info(index) == expected.get_info(offset + index)
+    assert sum(len(result) for _, result in chunks) == len(packages)
+
+
+def test_package_file(tmp_path):
+    path = str(tmp_path / 'packages.bin')
+    homework.write_package_file(path, PACKAGES)
+    with homework.PackageFile(path) as package_file:
+        assert len(package_file) == len(PACKAGES)
+        assert list(package_file.workout_types) == [
+            workout_type for workout_type, _ in PACKAGES
+        ]
+        assert isinstance(package_file.columns['weight'], memoryview), (
+            'Столбцы файла должны читаться без копирования.'
+        )
+        result = package_file.calculate()
+    expected = homework.read_package_batch(PACKAGES)
+    assert result == expected
+
+
+def test_package_file_float_params(tmp_path):
+    packages = [('RUN', [1206.0, 12, 6]), ('SWM', [720, 1, 80, 25, 40.0]),
+                ('RUN', [1206.5, 12, 6]), ('SWM', [720, 1, 80, 25, 40.5])]
+    path = str(tmp_path / 'packages.bin')
+    homework.write_package_file(path, packages)
+    with homework.PackageFile(path) as package_file:
+        result = package_file.calculate()
+    assert result == homework.read_package_batch(packages), (
+        'Дробные action и count_pool должны сохраняться без потерь.'
+    )
+
+
+def test_package_file_bad_magic(tmp_path):
+    path = tmp_path / 'packages.bin'
+    path.write_bytes(b'NOPE' + bytes(60))
+    with pytest.raises(ValueError):
+        homework.PackageFile(str(path))
+
+
+def test_training_cache():
+    cache = homework.TrainingCache(maxsize=2)
+    first = cache.show_training_info('RUN', [1206, 12, 6])
+    assert first == homework.read_package(
+        'RUN', [1206, 12, 6]
+    ).show_training_info()
+    assert cache.show_training_info('RUN', (1206, 12.0, 6)) is first, (
+        'Повторный пакет должен браться из кэша.'
+    )
+    cache.show_training_info('SWM', [720, 1, 80, 25, 40])
+    cache.show_training_info('WLK', [9000, 1, 75, 180])
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'evictions': 1,
+                             'size': 2, 'maxsize': 2}
+    cache.show_training_info('RUN', [1206, 12, 6])
+    assert cache.misses == 4
+
+
+def test_training_cache_threads():
+    cache = homework.TrainingCache(maxsize=4)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(
+            lambda package: cache.show_training_info(*package),
+            PACKAGES * 50
+        ))
+    assert len(results) == len(PACKAGES) * 50
+    stats = cache.stats()
+    assert stats['hits'] + stats['misses'] == len(results)
+    assert stats['size'] == 4
+
+
+def test_profiling(tmp_path):
+    profiler = homework.enable_profiling()
+    try:
+        for package in PACKAGES:
+            homework.main(homework.read_package(*package))
+        homework.read_package_batch(PACKAGES)
+    finally:
+        assert homework.disable_profiling() is profiler
+    snapshot = profiler.snapshot()
+    assert set(snapshot) == {'dispatch', 'calories', 'message', 'batch'}
+    for stage in ('dispatch', 'calories', 'message'):
+        assert {code: stats['count']
+                for code, stats in snapshot[stage].items()} == {
+            'SWM': 2, 'RUN': 2, 'WLK': 2
+        }
+    assert snapshot['dispatch']['RUN']['buckets'][float('inf')] == 2
+    path = tmp_path / 'metrics.prom'
+    profiler.write_prometheus(str(path))
+    text = path.read_text(encoding='utf-8')
+    assert '# TYPE homework_stage_seconds histogram' in text
+    assert ('homework_stage_seconds_count{stage="message",'
+            'workout_type="SWM"} 2') in text
+    homework.main(homework.read_package(*PACKAGES[0]))
+    assert profiler.snapshot()['dispatch']['SWM']['count'] == 2, (
+        'После выключения замеры не должны записываться.'
+    )
+
+
+def test_iter_stream_results():
+    async def collect():
+        sources = [homework.iter_packages_async(PACKAGES, delay=0.001)
+                   for _ in range(3)]
+        return [result async for result in homework.iter_stream_results(
+            sources, max_batch=4, max_delay=0.01
+        )]
+
+    results = asyncio.run(collect())
+    assert all(len(result) <= 4 for result in results), (
+        'Размер микропакета не должен превышать `max_batch`.'
+    )
+    messages = sorted(message for result in results
+                      for message in homework.render_messages(result))
+    expected = homework.render_messages(homework.read_package_batch(PACKAGES))
+    assert messages == sorted(expected * 3)
+
+
+def test_async_batcher_rejected():
+    async def run():
+        async with homework.AsyncBatcher(max_delay=0.001) as batcher:
+            await batcher.submit('BIKE', [1, 1, 1])
+            await batcher.submit('RUN', [10 ** 400, 1, 75])
+            await batcher.submit(*PACKAGES[0])
+            await batcher.close()
+            return batcher, [result async for result in batcher]
+
+    batcher, results = asyncio.run(run())
+    assert results == [homework.read_package_batch(PACKAGES[:1])]
+    assert [package[:2] for package in batcher.rejected] == [
+        ('BIKE', [1, 1, 1]), ('RUN', [10 ** 400, 1, 75])
+    ]
+
+
+def test_iter_stream_results_rejected():
+    rejected = []
+
+    async def collect():
+        sources = [
+            homework.iter_packages_async([('RUN', [1206, 0, 6])] + PACKAGES),
+            homework.iter_packages_async(PACKAGES),
+        ]
+        return [result async for result in homework.iter_stream_results(
+            sources, max_batch=4, max_delay=0.01,
+            on_reject=lambda *package: rejected.append(package)
+        )]
+
+    results = asyncio.run(collect())
+    assert sum(len(result) for result in results) == 2 * len(PACKAGES), (
+        'Недопустимый пакет не должен прерывать поток остальных.'
+    )
+    assert rejected == [('RUN', [1206, 0, 6], 'Нулевое значение duration')]
+
+
+def test_training_aggregator():
+    day = 86400
+    aggregator = homework.TrainingAggregator(bucket_seconds=day, retention=7)
+    infos = [homework.read_package(*package).show_training_info()
+             for package in PACKAGES]
+    for number, info in enumerate(infos):
+        aggregator.add('anna', number * day, info)
+    aggregator.add('boris', 5 * day, infos[0])
+    daily = aggregator.totals('anna')
+    assert daily.count == 1
+    assert daily.calories == infos[-1].calories
+    weekly = aggregator.totals('anna', buckets=7)
+    assert weekly.count == len(infos)
+    assert weekly.distance == sum(info.distance for info in infos)
+    assert weekly.mean('speed') == (
+        sum(info.speed for info in infos) / len(infos)
+    )
+    aggregator.add('anna', 20 * day, infos[0])
+    assert aggregator.totals('anna', buckets=7).count == 1, (
+        'Устаревшие корзины должны удаляться.'
+    )
+    assert aggregator.totals('boris', buckets=30).count == 0
+
+
+def test_training_aggregator_merge():
+    result = homework.read_package_batch(PACKAGES)
+    athletes = ['anna', 'boris'] * 3
+    timestamps = [0] * len(PACKAGES)
+    whole = homework.TrainingAggregator()
+    whole.add_batch(athletes, timestamps, result)
+    parts = [homework.TrainingAggregator(), homework.TrainingAggregator()]
+    for row in range(len(result)):
+        parts[row // 3].add(athletes[row], 0, result.get_info(row))
+    parts[0].merge(parts[1])
+    for athlete in ('anna', 'boris'):
+        merged = parts[0].totals(athlete)
+        expected = whole.totals(athlete)
+        assert merged.count == expected.count
+        for field in ('duration', 'distance', 'speed', 'calories'):
+            assert getattr(merged, field) == pytest.approx(
+                getattr(expected, field)
+            ), 'Слияние агрегаторов должно сохранять суммы.'
+
+
+def test_training_aggregator_merge_empty():
+    aggregator = homework.TrainingAggregator(bucket_seconds=10)
+    info = homework.read_package(*PACKAGES[0]).show_training_info()
+    aggregator.add('anna', -25, info)
+    aggregator.merge(homework.TrainingAggregator(bucket_seconds=10))
+    assert aggregator.newest == -3, (
+        'Слияние с пустым агрегатором не должно сбрасывать newest.'
+    )
+    assert aggregator.totals('anna').count == 1
+
+
+class Cycling(homework.Training):
+    LEN_STEP = 5.0
+
+    def get_spent_calories(self):
+        return self.get_mean_speed() * self.weight
+
+    @classmethod
+    def get_spent_calories_batch(cls, columns, speed):
+        return [mean_speed * weight
+                for mean_speed, weight in zip(speed, columns['weight'])]
+
+
+@pytest.fixture
+def cycling():
+    homework.register_training('CYC')(Cycling)
+    yield Cycling
+    homework.unregister_training('CYC')
+
+
+def test_register_training(cycling):
+    assert homework.TRAINING_PARAMS['CYC'] == ('action', 'duration', 'weight')
+    training = homework.read_package('CYC', [1000, 2, 70])
+    assert isinstance(training, Cycling)
+    packages = PACKAGES + [('CYC', [1000, 2, 70])]
+    result = homework.read_package_batch(packages)
+    assert result.get_info(len(PACKAGES)) == training.show_training_info()
+    with pytest.raises(ValueError):
+        homework.register_training('CYC')(Cycling)
+
+
+def test_register_training_validation():
+    with pytest.raises(TypeError):
+        homework.register_training('BAD')(dict)
+
+    class Flexible(homework.Training):
+        def __init__(self, *args):
+            super().__init__(*args)
+
+    with pytest.raises(TypeError):
+        homework.register_training('BAD')(Flexible)
+
+    class Rowing(homework.Running):
+        def get_distance(self):
+            return self.action / homework.Training.M_IN_KM
+
+    class Resting(homework.Training):
+        def get_spent_calories(self):
+            return 0.0
+
+    for training_class in (Rowing, Resting):
+        with pytest.raises(TypeError):
+            homework.register_training('BAD')(training_class)
+    assert 'BAD' not in homework.TRAINING_TYPES
+
+
+def test_read_package_wrong_length():
+    with pytest.raises(ValueError):
+        homework.read_package('WLK', [9000, 1, 75])
+
+
+def test_group_packages():
+    groups = homework.group_packages(PACKAGES)
+    rows, columns = groups['WLK']
+    assert rows == [2, 4]
+    assert columns == {'action': [9000, 420], 'duration': [1, 4],
+                       'weight': [75, 20], 'height': [180, 42]}
+
+
+def test_validate_packages():
+    packages = PACKAGES + [
+        ('RUN', [1206, 0, 6]),
+        ('WLK', [9000, 1, 75, 0]),
+        ('SWM', [720, 1, 80]),
+        ('BIKE', [1, 1, 1]),
+        ('RUN', [1206, '12', 6]),
+        ('RUN', None),
+        ('SWM', 720),
+        ('RUN',),
+        None,
+        ('RUN', [1206, 12, 6], 'extra'),
+        (['RUN'], [1206, 12, 6]),
+    ]
+    report = homework.validate_packages(packages)
+    assert report.valid == list(range(len(PACKAGES)))
+    assert report.rejected == [
+        (6, 'Нулевое значение duration'),
+        (7, 'Нулевое значение height'),
+        (8, 'Неверное количество параметров тренировки'),
+        (9, 'Такой тренировки нету'),
+        (10, 'Нечисловое значение duration'),
+        (11, 'Параметры тренировки должны быть списком'),
+        (12, 'Параметры тренировки должны быть списком'),
+        (13, 'Пакет должен состоять из кода и параметров'),
+        (14, 'Пакет должен состоять из кода и параметров'),
+        (15, 'Пакет должен состоять из кода и параметров'),
+        (16, 'Такой тренировки нету'),
+    ]
+    assert homework.read_package_batch(report.select(packages)) == (
+        homework.read_package_batch(PACKAGES)
+    )
+
+
+def test_validate_batch():
+    workout_types, columns = package_columns(PACKAGES)
+    workout_types.append('BIKE')
+    for column in columns.values():
+        column.append(1)
+    columns['duration'][0] = 0
+    report = homework.validate_batch(workout_types, **columns)
+    assert report.valid == list(range(1, len(PACKAGES)))
+    assert report.rejected == [(0, 'Нулевое значение duration'),
+                               (len(PACKAGES), 'Такой тренировки нету')]
+
+
+@pytest.mark.parametrize('workout_type, data, field, value', [
+    ('RUN', [9000, 1, 75], 'duration', 2),
+    ('WLK', [9000, 1, 75, 180], 'height', 150),
+    ('SWM', [720, 1, 80, 25, 40], 'count_pool', 20),
+])
+def test_cached_metrics(workout_type, data, field, value):
+    training = homework.read_package(workout_type, data)
+    first = training.show_training_info()
+    assert training.get_spent_calories() == first.calories
+    assert training.get_spent_calories() is training.get_spent_calories(), (
+        'Показатели должны вычисляться не больше одного раза.'
+    )
+    setattr(training, field, value)
+    changed = dict(zip(homework.TRAINING_PARAMS[workout_type], data))
+    changed[field] = value
+    expected = homework.read_package(workout_type, list(changed.values()))
+    assert training.show_training_info() == expected.show_training_info(), (
+        'После изменения параметров показатели нужно пересчитать.'
+    )
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_export_csv(tmp_path, compress):
+    result = homework.read_package_batch(PACKAGES)
+    path = str(tmp_path / 'results.csv')
+    homework.export_csv([result, result], path, compress=compress)
+    opener = gzip.open if compress else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == list(homework.RESULT_FIELDS)
+    assert len(rows) == 2 * len(PACKAGES) + 1
+    for index, row in enumerate(rows[1:len(PACKAGES) + 1]):
+        info = result.get_info(index)
+        assert row[0] == info.training_type
+        assert [float(value) for value in row[1:]] == [
+            info.duration, info.distance, info.speed, info.calories
+        ], 'CSV должен сохранять значения без потери точности.'
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_export_columnar(tmp_path, compress):
+    results = [homework.read_package_batch(PACKAGES),
+               homework.read_package_batch(PACKAGES[:2])]
+    path = str(tmp_path / 'results.bin')
+    homework.export_columnar(results, path, compress=compress)
+    assert list(homework.read_columnar(path)) == results
+
+
+def test_export_columnar_many_names(tmp_path):
+    size = 300
+    result = homework.BatchResult(
+        [f'Тренировка {index}' for index in range(size)],
+        *(array('d', range(size)) for _ in homework.RESULT_COLUMNS)
+    )
+    path = str(tmp_path / 'results.bin')
+    homework.export_columnar([result], path)
+    assert list(homework.read_columnar(path)) == [result], (
+        'В блоке может быть больше 256 названий тренировок.'
+    )
+    size = homework.RESULT_MAX_NAMES + 1
+    result = homework.BatchResult(
+        [str(index) for index in range(size)],
+        *(array('d', bytes(8 * size)) for _ in homework.RESULT_COLUMNS)
+    )
+    with pytest.raises(ValueError):
+        homework.export_columnar([result], path)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_read_columnar_truncated(tmp_path, compress):
+    path = tmp_path / 'results.bin'
+    homework.export_columnar([homework.read_package_batch(PACKAGES)],
+                             str(path), compress=compress)
+    data = path.read_bytes()
+    for size in range(len(data)):
+        path.write_bytes(data[:size])
+        if size == homework.RESULT_HEADER.size:
+            assert list(homework.read_columnar(str(path))) == []
+            continue
+        with pytest.raises(ValueError, match='повреждён'):
+            list(homework.read_columnar(str(path)))
+
+
+def test_run_cli(tmp_path, monkeypatch):
+    lines = ['# пакеты', ''] + [
+        ' '.join([workout_type] + [str(value) for value in data])
+        for workout_type, data in PACKAGES
+    ]
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('\n'.join(lines)))
+    with Capturing() as output:
+        assert homework.run_cli(['--chunk-size', '4']) == 0
+    assert output == homework.render_messages(
+        homework.read_package_batch(PACKAGES)
+    ), 'Команда должна печатать сообщения по пакетам из stdin.'
+    path = tmp_path / 'packages.txt'
+    path.write_text('RUN,1206,12,6\n', encoding='utf-8')
+    with Capturing() as output:
+        assert homework.run_cli([str(path), '--format', 'csv']) == 0
+    assert output[0] == ','.join(homework.RESULT_FIELDS)
+    assert output[1].startswith('Running,12.0,0.7838999999999999,')
+    path.write_text('BIKE 1 1 1\n', encoding='utf-8')
+    assert homework.run_cli([str(path)]) == 1
+
+
+@pytest.mark.parametrize('text, error', [
+    ('RUN 1206 12 6\nRUN abc 12 6\n',
+     'homework: строка 2: не удалось разобрать пакет «RUN abc 12 6»\n'),
+    ('# пакеты\n,\n',
+     'homework: строка 2: не удалось разобрать пакет «,»\n'),
+])
+def test_run_cli_parse_error(text, error, monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(text))
+    assert homework.run_cli([]) == 1
+    assert capsys.readouterr().err == error, (
+        'Ошибка разбора должна указывать номер строки.'
+    )
+
+
+def test_run_cli_zero_values(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(
+        'RUN 1206 12 6\nWLK 9000 1 75 0\n'
+    ))
+    assert homework.run_cli([]) == 1
+    error = capsys.readouterr().err
+    assert error == 'homework: пакет 2: Нулевое значение height\n', (
+        'Ошибка во входных данных должна выводиться одной строкой.'
+    )
+    path = str(tmp_path / 'packages.bin')
+    homework.write_package_file(path, [('RUN', [1206, 0, 6])])
+    assert homework.run_cli([path, '--binary']) == 1
+    assert 'Traceback' not in capsys.readouterr().err
+
+
+def test_lazy_imports():
+    heavy = ('asyncio', 'concurrent.futures', 'csv', 'dataclasses', 'gzip',
+             'inspect', 'mmap', 'zlib')
+    code = ('import sys, homework; '
+            f'print([name for name in {heavy!r} if name in sys.modules])')
+    output = subprocess.run([sys.executable, '-c', code], check=True,
+                            capture_output=True, text=True,
+                            cwd=os.path.dirname(homework.__file__))
+    assert output.stdout.strip() == '[]', (
+        'Тяжёлые модули должны загружаться только при использовании.'
+    )
+
+
+def test_calculator_service():
+    packages = PACKAGES * 20 + [('BIKE', [1, 1, 1])]
+    with homework.CalculatorService(max_workers=2, max_batch=16,
+                                    max_delay=0.01) as service:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = list(executor.map(
+                lambda package: service.submit(*package), packages
+            ))
+        batch = service.submit_batch(PACKAGES)
+        for future, package in zip(futures, PACKAGES * 20):
+            assert future.result(timeout=5) == homework.read_package(
+                *package
+            ).show_training_info()
+        with pytest.raises(ValueError):
+            futures[-1].result(timeout=5)
+        assert batch.result(timeout=5) == homework.read_package_batch(
+            PACKAGES
+        )
+    with pytest.raises(RuntimeError):
+        service.submit(*PACKAGES[0])
+
+
+def test_athlete_profile():
+    profile = homework.AthleteProfile(weight=75, height=180)
+    packages = [
+        ('RUN', [action, duration, 75])
+        for action, duration in ((9000, 1), (15000, 1.5), (1206, 12))
+    ] + [
+        ('WLK', [9000, 1, 75, 180]),
+        ('WLK', [4200, 0.5, 75, 180]),
+        ('SWM', [720, 1, 75, 25, 40]),
+    ]
+    workout_types, columns = package_columns(packages)
+    del columns['weight'], columns['height']
+    result = profile.calculate(workout_types, **columns)
+    expected = homework.read_package_batch(packages)
+    assert result.training_type == expected.training_type
+    assert result.distance == expected.distance
+    assert result.speed == expected.speed
+    for index, (workout_type, _) in enumerate(packages):
+        if workout_type == 'RUN':
+            assert result.calories[index] == pytest.approx(
+                expected.calories[index], rel=homework.PROFILE_TOLERANCE
+            )
+        else:
+            assert result.calories[index] == expected.calories[index], (
+                'Профиль спортсмена должен давать те же калории.'
+            )
+
+
+def test_process_packages_shared():
+    packages = PACKAGES * 7
+    expected = homework.read_package_batch(packages)
+    with homework.process_packages_shared(packages, max_workers=2,
+                                          chunk_size=5) as shared:
+        assert len(shared) == len(packages)
+        assert list(shared.distance) == list(expected.distance)
+        assert list(shared.speed) == list(expected.speed)
+        assert list(shared.calories) == list(expected.calories), (
+            'Результаты из разделяемой памяти должны совпадать с расчётом.'
+        )
+        names = shared.names
+    from multiprocessing import shared_memory
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_process_packages_shared_error():
+    with pytest.raises(ValueError):
+        homework.process_packages_shared([('BIKE', [1, 1, 1])])
+
+
+def test_run_checkpointed_resume(tmp_path, monkeypatch):
+    package_path = str(tmp_path / 'packages.bin')
+    homework.write_package_file(package_path, PACKAGES * 5)
+    expected_path = str(tmp_path / 'expected.csv')
+    expected = homework.run_checkpointed(package_path, expected_path,
+                                         chunk_size=4)
+    output_path = str(tmp_path / 'output.csv')
+    checkpoint_path = output_path + '.checkpoint'
+    calculate_batch = homework.calculate_batch
+    calls = []
+
+    def crash(*args, **kwargs):
+        calls.append(None)
+        if len(calls) > 5:
+            raise RuntimeError('Сбой')
+        return calculate_batch(*args, **kwargs)
+
+    monkeypatch.setattr(homework, 'calculate_batch', crash)
+    with pytest.raises(RuntimeError):
+        homework.run_checkpointed(package_path, output_path, chunk_size=4,
+                                  checkpoint_interval=2)
+    monkeypatch.setattr(homework, 'calculate_batch', calculate_batch)
+    assert os.path.exists(checkpoint_path), (
+        'После сбоя должна остаться контрольная точка.'
+    )
+    with open(output_path, 'ab') as file:
+        file.write(b'garbage\n')
+    totals = homework.run_checkpointed(package_path, output_path,
+                                       chunk_size=3)
+    assert totals == expected
+    with open(output_path, 'rb') as output, \
+            open(expected_path, 'rb') as reference:
+        assert output.read() == reference.read(), (
+            'Продолженный расчёт должен совпадать с непрерывным.'
+        )
+    assert not os.path.exists(checkpoint_path), (
+        'Контрольная точка удаляется после завершения.'
+    )
+
+
+def test_run_checkpointed_other_source(tmp_path):
+    package_path = str(tmp_path / 'packages.bin')
+    homework.write_package_file(package_path, PACKAGES)
+    output_path = str(tmp_path / 'output.csv')
+    with open(output_path + '.checkpoint', 'w', encoding='utf-8') as file:
+        file.write('{"version": %d, "source": [0, 0]}'
+                   % homework.CHECKPOINT_VERSION)
+    with pytest.raises(ValueError):
+        homework.run_checkpointed(package_path, output_path)
+
+
+def test_run_checkpointed_same_size_source(tmp_path, monkeypatch):
+    package_path = str(tmp_path / 'packages.bin')
+    packages = PACKAGES * 5
+    homework.write_package_file(package_path, packages)
+    output_path = str(tmp_path / 'output.csv')
+    calculate_batch = homework.calculate_batch
+    calls = []
+
+    def crash(*args, **kwargs):
+        calls.append(None)
+        if len(calls) > 2:
+            raise RuntimeError('Сбой')
+        return calculate_batch(*args, **kwargs)
+
+    monkeypatch.setattr(homework, 'calculate_batch', crash)
+    with pytest.raises(RuntimeError):
+        homework.run_checkpointed(package_path, output_path, chunk_size=2,
+                                  checkpoint_interval=1)
+    monkeypatch.setattr(homework, 'calculate_batch', calculate_batch)
+    stat = os.stat(package_path)
+    homework.write_package_file(package_path, packages[::-1])
+    os.utime(package_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.path.getsize(package_path) == stat.st_size
+    with pytest.raises(ValueError, match='другому файлу'):
+        homework.run_checkpointed(package_path, output_path, chunk_size=2)
+
+
+@pytest.mark.parametrize('options', [{'checkpoint_interval': 0},
+                                     {'chunk_size': 0}])
+def test_run_checkpointed_invalid_options(tmp_path, options):
+    package_path = str(tmp_path / 'packages.bin')
+    homework.write_package_file(package_path, PACKAGES)
+    with pytest.raises(ValueError):
+        homework.run_checkpointed(package_path, str(tmp_path / 'output.csv'),
+                                  **options)
+
+
+def test_iter_stream_results_source_error():
+    async def failing():
+        yield PACKAGES[0]
+        raise ConnectionError('Датчик отключился')
+
+    async def collect():
+        return [result async for result in homework.iter_stream_results(
+            [failing(), homework.iter_packages_async(PACKAGES)],
+            max_delay=0.01
+        )]
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(asyncio.wait_for(collect(), timeout=5))